@@ -1 +1,9 @@
 from .yclients import AsyncYClientsAPI
+from .ratelimit import RateLimiter, Retry, TokenBucket
+from .cache import CacheKey, ResponseCache
+from .sync import SQLiteCheckpointStore
+from .models import Client, Service, Slot, Staff, Visit
+from .hooks import MetricsCollector, RequestEvent, RequestHooks
+from .availability import AvailabilityMatrix
+from .booking import BookingResult
+from .manager import AsyncYClientsManager, FairScheduler
@@ -0,0 +1,154 @@
+# coding=utf-8
+from __future__ import annotations
+
+import array
+import bisect
+import datetime
+import heapq
+import itertools
+import time
+
+from .dates import parse_datetime
+
+
+def to_timestamp(value, timezone: datetime.tzinfo = None) -> int:
+    """
+    Unix timestamp of slot or booking date
+    :param value: unix timestamp, date, datetime or iso8601 string
+    :param timezone: timezone of naive values and dates, UTC if None
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone or datetime.timezone.utc)
+    return int(value.timestamp())
+
+
+def _id(value) -> int | None:
+    return None if value is None else int(value)
+
+
+class AvailabilityMatrix:
+    """
+    Free time slots of staff by service indexed for lookups without requests to API.
+    Slots of every (staff_id, service_id) pair are kept as a sorted array of unix timestamps,
+     service_id is None for slots loaded without service
+    """
+
+    def __init__(self, timezone: datetime.tzinfo = None):
+        """
+        :param timezone: timezone of returned datetimes and of naive datetimes and dates passed to lookups,
+            it is taken from the first added slot if None
+        """
+        self.timezone = timezone
+        self.__slots = {}
+
+    def __len__(self):
+        """ Total number of slots """
+        return sum(len(slots) for slots in self.__slots.values())
+
+    def __repr__(self):
+        return f"{type(self).__name__}(pairs={len(self.__slots)}, slots={len(self)})"
+
+    @property
+    def pairs(self) -> list:
+        """ (staff_id, service_id) pairs which slots were added """
+        return list(self.__slots)
+
+    @property
+    def staff_ids(self) -> list:
+        return sorted({staff_id for staff_id, _ in self.__slots})
+
+    def add(self, staff_id, service_id, slots: list):
+        """
+        Add slots of staff for service
+        :param staff_id: staff id
+        :param service_id: service id or None
+        :param slots: 'data' of book_times response, list of dictionaries with 'datetime'
+        """
+        values = [slot['datetime'] for slot in slots if slot.get('datetime') is not None]
+        if self.timezone is None:
+            for value in values:
+                if isinstance(value, str):
+                    self.timezone = parse_datetime(value).tzinfo
+                    break
+        key = (_id(staff_id), _id(service_id))
+        timestamps = set(self.__slots.get(key, ()))
+        timestamps.update(self.__timestamp(value) for value in values)
+        self.__slots[key] = array.array('q', sorted(timestamps))
+
+    def __timestamp(self, value) -> int:
+        """ Unix timestamp of value, naive datetimes and dates are in the matrix timezone """
+        return to_timestamp(value, self.timezone)
+
+    def __datetime(self, timestamp: int) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(timestamp, self.timezone or datetime.timezone.utc)
+
+    def __arrays(self, staff_id=None, service_id=None) -> list:
+        """ [((staff_id, service_id), timestamps)] for pairs matching staff and service, None matches any """
+        staff_id, service_id = _id(staff_id), _id(service_id)
+        return [(key, timestamps) for key, timestamps in self.__slots.items()
+                if (staff_id is None or key[0] == staff_id) and (service_id is None or key[1] == service_id)]
+
+    def timestamps(self, staff_id, service_id=None) -> array.array:
+        """
+        :return: sorted array of slot timestamps of staff for service,
+            slots for all the services are merged if service_id is None
+        """
+        arrays = self.__arrays(staff_id, service_id)
+        if len(arrays) == 1:
+            return arrays[0][1]
+        return array.array('q', sorted({timestamp for _, timestamps in arrays for timestamp in timestamps}))
+
+    def slots(self, staff_id, service_id=None, start=None, end=None) -> list:
+        """
+        :param staff_id: staff id
+        :param service_id: service id, slots for all the services if None
+        :param start: first slot time, inclusive, date means its midnight
+        :param end: last slot time, exclusive, date means its midnight
+        :return: list of timezone aware datetimes of free slots
+        """
+        timestamps = self.timestamps(staff_id, service_id)
+        low = bisect.bisect_left(timestamps, self.__timestamp(start)) if start is not None else 0
+        high = bisect.bisect_left(timestamps, self.__timestamp(end)) if end is not None else len(timestamps)
+        return [self.__datetime(timestamp) for timestamp in timestamps[low:high]]
+
+    def is_free(self, staff_id, date_time, service_id=None) -> bool:
+        """ True if slot of staff starts at date_time """
+        timestamps = self.timestamps(staff_id, service_id)
+        timestamp = self.__timestamp(date_time)
+        index = bisect.bisect_left(timestamps, timestamp)
+        return index < len(timestamps) and timestamps[index] == timestamp
+
+    def next_free_slot(self, after=None, staff_id=None, service_id=None) -> tuple | None:
+        """
+        The earliest free slot at or after the moment
+        :param after: datetime, iso8601 string or unix timestamp, now if None
+        :param staff_id: staff id, any staff if None
+        :param service_id: service id, any service if None
+        :return: (datetime, staff_id, service_id) or None if there are no slots
+        """
+        timestamp = self.__timestamp(after) if after is not None else int(time.time())
+        candidates = []
+        for key, timestamps in self.__arrays(staff_id, service_id):
+            index = bisect.bisect_left(timestamps, timestamp)
+            if index < len(timestamps):
+                candidates.append((timestamps[index], key))
+        if not candidates:
+            return None
+        slot, (staff_id, service_id) = min(candidates, key=lambda candidate: candidate[0])
+        return self.__datetime(slot), staff_id, service_id
+
+    def next_free_slots(self, n: int, after=None, staff_id=None, service_id=None) -> list:
+        """ :return: list of up to n earliest (datetime, staff_id, service_id) at or after the moment """
+        timestamp = self.__timestamp(after) if after is not None else int(time.time())
+        streams = []
+        for key, timestamps in self.__arrays(staff_id, service_id):
+            index = bisect.bisect_left(timestamps, timestamp)
+            streams.append(zip(timestamps[index:], itertools.repeat(key)))
+        slots = heapq.merge(*streams, key=lambda candidate: candidate[0])
+        return [(self.__datetime(slot), *key) for slot, key in itertools.islice(slots, n)]
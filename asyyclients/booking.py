@@ -0,0 +1,57 @@
+# coding=utf-8
+from __future__ import annotations
+
+
+class BookingResult:
+    """
+    Result of one booking made by AsyncYClientsAPI.book_many():
+        - booking: booking dictionary passed to book_many
+        - success: True if the record was created
+        - status_code: response status code, None if request failed without response
+        - error_code: error code from response body, None if there is no code
+        - message: error message, empty string on success
+        - record_id, record_hash: created record, None on failure
+    """
+
+    __slots__ = ('booking', 'success', 'status_code', 'error_code', 'message', 'record_id', 'record_hash')
+
+    def __init__(self, booking: dict, success: bool, status_code: int = None, error_code: int = None,
+                 message: str = '', record_id: int = None, record_hash: str = None):
+        self.booking = booking
+        self.success = success
+        self.status_code = status_code
+        self.error_code = error_code
+        self.message = message
+        self.record_id = record_id
+        self.record_hash = record_hash
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        if self.success:
+            return f"BookingResult(success=True, record_id={self.record_id!r})"
+        return (f"BookingResult(success=False, status_code={self.status_code!r}, "
+                f"error_code={self.error_code!r}, message={self.message!r})")
+
+
+def booking_error(status_code: int, res) -> tuple | None:
+    """
+    Error of book_record response
+    :param status_code: response status code
+    :param res: decoded response body, None if body is empty
+    :return: (error_code, message) or None if booking succeeded
+    """
+    if isinstance(res, dict):
+        errors = res.get('errors')
+        if isinstance(errors, list) and errors:
+            errors = errors[0]
+        if isinstance(errors, dict) and errors:
+            return errors.get('code'), errors.get('message', '')
+        if errors:
+            return None, str(errors)
+        if res.get('success') is False:
+            return None, (res.get('meta') or {}).get('message', '')
+    if status_code >= 400:
+        return None, f"status {status_code}"
+    return None
@@ -0,0 +1,131 @@
+# coding=utf-8
+import asyncio
+import collections
+import time
+
+
+class CacheKey(collections.namedtuple('CacheKey', ['endpoint', 'staff_id', 'day', 'query'])):
+    """
+    Key of the cached response:
+        - endpoint: last part of the api path, for example 'book_times'
+        - staff_id: staff the response depends on, None if any staff
+        - day: date in YYYY-MM-DD format the response depends on, None if any date
+        - query: tuple of sorted querystring items
+    """
+
+    @classmethod
+    def build(cls, endpoint: str, staff_id=None, day=None, querystring: dict = None) -> 'CacheKey':
+        query = tuple(sorted((str(k), str(v)) for k, v in (querystring or {}).items()))
+        return cls(endpoint, str(staff_id) if staff_id else None, day, query)
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache with TTL per endpoint for booking widget responses.
+    Concurrent requests with the same key share one in-flight request.
+    Cached values are shared between callers and must not be modified
+    """
+
+    DEFAULT_TTLS = {
+        'book_staff': 300,
+        'book_services': 300,
+        'book_dates': 60,
+        'book_times': 30,
+    }
+
+    def __init__(self, ttls: dict = None, maxsize: int = 1024, default_ttl: float = 60):
+        """
+        :param ttls: dictionary with endpoint as key and time to live in seconds as value,
+            updates DEFAULT_TTLS
+        :param maxsize: maximum number of cached responses, least recently used are dropped
+        :param default_ttl: time to live for endpoints which are not in ttls
+        """
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.__entries = collections.OrderedDict()
+        self.__in_flight = {}
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key: CacheKey):
+        """ Return cached value or None if it is missing or expired """
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self.__entries[key]
+            return None
+        self.__entries.move_to_end(key)
+        return value
+
+    def set(self, key: CacheKey, value):
+        ttl = self.ttls.get(key.endpoint, self.default_ttl)
+        if ttl <= 0:
+            return
+        self.__entries[key] = (time.monotonic() + ttl, value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: CacheKey, fetch):
+        """
+        :param key: cache key
+        :param fetch: coroutine function which loads the value if it isn't cached
+        :return: cached or loaded value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        future = self.__in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.__fetch(key, fetch))
+            self.__in_flight[key] = future
+        # shield, so cancellation of one caller doesn't cancel request for the others
+        return await asyncio.shield(future)
+
+    async def __fetch(self, key: CacheKey, fetch):
+        future = self.__in_flight.get(key)
+        try:
+            value = await fetch()
+        finally:
+            # key is removed from in-flight requests if it was invalidated while request was sent
+            valid = future is not None and self.__in_flight.get(key) is future
+            if valid:
+                del self.__in_flight[key]
+        # responses with errors are not cached, the next call will repeat the request
+        if valid and not (isinstance(value, dict) and value.get('success') is False):
+            self.set(key, value)
+        return value
+
+    def invalidate(self, predicate=None) -> int:
+        """
+        Drop cached values and forget in-flight requests
+        :param predicate: function which takes CacheKey and returns True if it must be dropped,
+            all the values are dropped if None
+        :return: number of dropped values
+        """
+        keys = [key for key in self.__entries if predicate is None or predicate(key)]
+        for key in keys:
+            del self.__entries[key]
+        for key in [key for key in self.__in_flight if predicate is None or predicate(key)]:
+            del self.__in_flight[key]
+        return len(keys)
+
+    def invalidate_availability(self, staff_id=None, day: str = None) -> int:
+        """
+        Drop responses which could change after booking with staff_id on day.
+        Responses for any staff or any date are dropped too
+        :param staff_id: staff id, responses for all the staff are dropped if None
+        :param day: date in YYYY-MM-DD format, responses for all the dates are dropped if None
+        :return: number of dropped values
+        """
+        staff_id = str(staff_id) if staff_id else None
+
+        def affected(key: CacheKey) -> bool:
+            return (staff_id is None or key.staff_id in (None, staff_id)) \
+                and (day is None or key.day in (None, day))
+
+        return self.invalidate(affected)
@@ -0,0 +1,33 @@
+# coding=utf-8
+from __future__ import annotations
+
+import datetime
+
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """
+    Fast iso8601 parser, timezone offset is preserved.
+    Accepts '+03:00', '+0300', '-05:00' and 'Z' offsets, datetime without offset is naive
+    :param value: iso8601 string, for example '2022-09-01T10:00:00+03:00'
+    :return: datetime
+    """
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        # python < 3.11 fromisoformat doesn't accept 'Z' and offsets without colon
+        return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+
+def to_day(value) -> str | None:
+    """
+    Date in YYYY-MM-DD format
+    :param value: date, datetime, iso8601 string or unix timestamp (its UTC date)
+    :return: date string or None if value is empty
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).strftime("%Y-%m-%d")
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
@@ -0,0 +1,156 @@
+# coding=utf-8
+import ujson
+
+from .sync import parse_change_date
+
+# fixed export schemas: (column, type), types are converted by RecordWriter
+# 'timestamp' columns are stored in UTC, 'json' columns keep nested data as JSON strings
+CLIENT_FIELDS = [
+    ('id', 'int'), ('name', 'str'), ('phone', 'str'), ('email', 'str'), ('card', 'str'),
+    ('birth_date', 'str'), ('comment', 'str'), ('discount', 'float'), ('visits', 'int'),
+    ('sex_id', 'int'), ('sex', 'str'), ('sms_check', 'int'), ('sms_bot', 'int'), ('spent', 'float'),
+    ('paid', 'float'), ('balance', 'float'), ('importance_id', 'int'), ('importance', 'str'),
+    ('categories', 'json'), ('last_change_date', 'timestamp'), ('custom_fields', 'json'),
+]
+
+VISIT_FIELDS = [
+    ('id', 'int'), ('company_id', 'int'), ('staff_id', 'int'), ('client_id', 'int'), ('services', 'json'),
+    ('goods_transactions', 'json'), ('staff', 'json'), ('client', 'json'), ('comer', 'json'),
+    ('clients_count', 'int'), ('date', 'str'), ('datetime', 'timestamp'), ('create_date', 'timestamp'),
+    ('comment', 'str'), ('online', 'bool'), ('visit_attendance', 'int'), ('attendance', 'int'),
+    ('confirmed', 'int'), ('seance_length', 'int'), ('length', 'int'), ('sms_before', 'int'),
+    ('sms_now', 'int'), ('sms_now_text', 'str'), ('email_now', 'int'), ('notified', 'int'),
+    ('master_request', 'int'), ('api_id', 'str'), ('from_url', 'str'), ('review_requested', 'int'),
+    ('visit_id', 'int'), ('created_user_id', 'int'), ('deleted', 'bool'), ('paid_full', 'int'),
+    ('prepaid', 'bool'), ('prepaid_confirmed', 'bool'), ('last_change_date', 'timestamp'),
+    ('custom_color', 'str'), ('custom_font_color', 'str'), ('record_labels', 'json'),
+    ('activity_id', 'int'), ('custom_fields', 'json'), ('documents', 'json'), ('is_sale_bill_printed', 'bool'),
+]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Export requires pyarrow, install it with `pip install asyyclients[parquet]`") from e
+    return pyarrow
+
+
+def _to_int(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+
+def _to_json(value):
+    return None if value is None else ujson.dumps(value, ensure_ascii=False)
+
+
+_CONVERTERS = {
+    'int': _to_int,
+    'float': _to_float,
+    'str': _to_str,
+    'bool': _to_bool,
+    'json': _to_json,
+    'timestamp': parse_change_date,
+}
+
+
+def build_schema(fields: list):
+    """ :return: pyarrow.Schema for list of (column, type) """
+    pa = _import_pyarrow()
+    types = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'str': pa.string(),
+        'bool': pa.bool_(),
+        'json': pa.string(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name in fields])
+
+
+class RecordWriter:
+    """
+    Streaming writer of records to Parquet or Arrow IPC file with fixed schema.
+    Records are buffered until row_group_size rows are collected and then written
+     as one row group (Parquet) or record batch (Arrow), so memory usage doesn't
+     depend on the number of records
+    """
+
+    FORMATS = ('parquet', 'arrow')
+
+    def __init__(self, path: str, fields: list, file_format: str = 'parquet', row_group_size: int = 10000,
+                 compression: str = 'zstd'):
+        """
+        :param path: output file path
+        :param fields: list of (column, type), CLIENT_FIELDS or VISIT_FIELDS
+        :param file_format: 'parquet' or 'arrow' (Arrow IPC file, can be memory mapped on reading)
+        :param row_group_size: number of rows in one row group
+        :param compression: parquet compression codec, ignored for arrow
+        """
+        if file_format not in self.FORMATS:
+            raise ValueError(f"file_format must be one of {self.FORMATS}")
+        self.__pa = _import_pyarrow()
+        self.fields = fields
+        self.schema = build_schema(fields)
+        self.row_group_size = row_group_size
+        self.rows_number = 0
+        self.__buffer = {name: [] for name, _ in fields}
+        self.__buffered = 0
+        if file_format == 'parquet':
+            self.__writer = self.__pa.parquet.ParquetWriter(path, self.schema, compression=compression)
+        else:
+            self.__writer = self.__pa.ipc.new_file(path, self.schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, records: list):
+        """ Add records to the buffer and write full row groups """
+        for name, type_name in self.fields:
+            convert = _CONVERTERS[type_name]
+            self.__buffer[name].extend(convert(record.get(name)) for record in records)
+        self.__buffered += len(records)
+        if self.__buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.__buffered:
+            return
+        batch = self.__pa.RecordBatch.from_arrays(
+            [self.__pa.array(self.__buffer[field.name], type=field.type) for field in self.schema],
+            schema=self.schema)
+        self.__writer.write_batch(batch)
+        self.rows_number += self.__buffered
+        self.__buffer = {name: [] for name, _ in self.fields}
+        self.__buffered = 0
+
+    def close(self):
+        self.flush()
+        self.__writer.close()
@@ -0,0 +1,104 @@
+# coding=utf-8
+"""
+DataFrame helpers of AsyncYClientsAPI. The module is imported on first use,
+ so the client itself doesn't need pandas: pip install asyyclients[pandas]
+"""
+try:
+    import pandas as pd
+except ImportError as e:
+    raise ImportError("DataFrame helpers require pandas, install it with `pip install asyyclients[pandas]`") from e
+
+# documented fields of the client returned by /clients
+CLIENT_COLUMNS = ['id', 'name', 'phone', 'email', 'card', 'birth_date', 'comment', 'discount', 'visits',
+                  'sex_id', 'sex', 'sms_check', 'sms_bot', 'spent', 'paid', 'balance', 'importance_id',
+                  'importance', 'categories', 'last_change_date', 'custom_fields']
+CLIENT_NUMERIC_COLUMNS = ['spent', 'paid', 'balance']
+ATTENDED_VISITS_COLUMNS = ['id', 'visits_number', 'first_visit', 'last_visit']
+
+
+def datetime_column_parser(date_times: pd.Series, utc: bool = False) -> pd.Series:
+    """
+    Vectorised parser of iso8601 datetime column
+    :param date_times: pd.Series of iso8601 strings
+    :param utc: convert to UTC, column with different offsets is always converted to UTC
+    :return: pd.Series of timezone aware datetimes
+    """
+    date_times = date_times.astype('string')
+    if not utc and date_times.str.slice(19).nunique() > 1:
+        utc = True
+    return pd.to_datetime(date_times, utc=utc, errors='coerce')
+
+
+def clients_frame(clients_data_list: list) -> pd.DataFrame:
+    """
+    Build dataframe from all the clients at once:
+        - spent, paid, balance are converted to float
+        - last_change_date is converted to datetime in UTC
+        - categories are replaced with comma separated titles of categories
+        - custom_fields are flattened to custom_fields.<field code> columns
+    :param clients_data_list: list of dictionaries with client data
+    :return: pd.Dataframe with clients data
+    """
+    # empty list goes through the same conversions, so columns and types don't depend on the number of clients
+    df = pd.DataFrame.from_records(clients_data_list) if clients_data_list else pd.DataFrame(columns=CLIENT_COLUMNS)
+
+    for column in CLIENT_NUMERIC_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    if 'last_change_date' in df:
+        df['last_change_date'] = pd.to_datetime(df['last_change_date'], utc=True, errors='coerce') \
+            .astype('datetime64[ns, UTC]')
+    if 'categories' in df:
+        df['categories'] = pd.Series([', '.join(category['title'] for category in categories or [])
+                                      for categories in df['categories']], index=df.index, dtype=object)
+    if 'custom_fields' in df:
+        # API returns empty list instead of empty dictionary for clients without custom fields
+        custom_fields = pd.DataFrame(
+            [fields if isinstance(fields, dict) else {} for fields in df.pop('custom_fields')],
+            index=df.index)
+        df = df.join(custom_fields.add_prefix('custom_fields.'))
+    return df
+
+
+def visits_dates_frame(summaries: list) -> pd.DataFrame:
+    """
+    :param summaries: list of dictionaries with id, visits_number and first_visit, last_visit in YYYY-MM-DD format
+    :return: Dataframe with ATTENDED_VISITS_COLUMNS, dates are converted to datetime.date
+    """
+    return _convert_visit_dates(pd.DataFrame.from_records(summaries, columns=ATTENDED_VISITS_COLUMNS))
+
+
+def _convert_visit_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """ Convert first_visit and last_visit columns from YYYY-MM-DD strings to dates, missing dates are None """
+    for column in ('first_visit', 'last_visit'):
+        dates = pd.to_datetime(df[column], format="%Y-%m-%d").dt.date
+        df[column] = dates.astype(object).where(df[column].notna(), None)
+    return df
+
+
+def _attendance_and_datetime(visit) -> tuple:
+    """ attendance and datetime of visit dictionary or Visit model, raw datetime of the model isn't parsed """
+    if isinstance(visit, dict):
+        return visit['attendance'], visit['datetime']
+    return visit.attendance, visit._datetime
+
+
+def attended_visits_dates_frame(clients_visits: dict) -> pd.DataFrame:
+    """
+    Number of attended visits and dates of the first and the last of them by columnar groupby
+    :param clients_visits: dictionary with client id as key and list of visits as value,
+        visits can be dictionaries or Visit models
+    :return: Dataframe with ATTENDED_VISITS_COLUMNS
+    """
+    cids = list(clients_visits)
+    visits = pd.DataFrame.from_records(
+        [(cid, *_attendance_and_datetime(visit)) for cid in cids for visit in clients_visits[cid]],
+        columns=['id', 'attendance', 'datetime'])
+    attended = visits[visits['attendance'] == 1]
+    # local date is the YYYY-MM-DD prefix of iso8601 datetime
+    dates = attended['datetime'].astype('string').str.slice(0, 10)
+    df = dates.groupby(attended['id']).agg(['count', 'min', 'max'])
+    df = df.reindex(pd.Index(cids, name='id'))
+    df = df.rename(columns={'count': 'visits_number', 'min': 'first_visit', 'max': 'last_visit'}).reset_index()
+    df['visits_number'] = df['visits_number'].fillna(0).astype('int64')
+    return _convert_visit_dates(df[ATTENDED_VISITS_COLUMNS])
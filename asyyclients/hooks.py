@@ -0,0 +1,195 @@
+# coding=utf-8
+import bisect
+import collections
+import math
+import re
+
+
+class RequestEvent:
+    """
+    Information about one attempt of the request passed to hooks:
+        - method, url: request method and url
+        - endpoint: api path without ids and dates, for example 'records' or 'book_times'
+        - attempt: number of the attempt starting from 0, greater than 0 for retries
+        - wait: time spent waiting for rate limiter in seconds
+        - in_flight: number of requests sent by the API object at the moment, including this one
+        - elapsed: time from sending request to receiving response or error in seconds
+        - status_code: response status code, None on error
+        - bytes_received: size of the response body
+        - error: exception if request failed
+    """
+
+    __slots__ = ('method', 'url', 'endpoint', 'attempt', 'wait', 'in_flight', 'elapsed', 'status_code',
+                 'bytes_received', 'error')
+
+    def __init__(self, method: str, url: str, attempt: int = 0):
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint_name(url)
+        self.attempt = attempt
+        self.wait = 0.0
+        self.in_flight = 0
+        self.elapsed = None
+        self.status_code = None
+        self.bytes_received = 0
+        self.error = None
+
+
+_ENDPOINT_SEGMENT = re.compile(r'^[a-z_]+$')
+
+
+def endpoint_name(url: str) -> str:
+    """ 'https://api.yclients.com/api/v1/records/123' -> 'records' """
+    path = str(url).split('?', 1)[0].split('://', 1)[-1]
+    segments = path.split('/')[1:]
+    if 'v1' in segments:
+        segments = segments[segments.index('v1') + 1:]
+    return '/'.join(segment for segment in segments if _ENDPOINT_SEGMENT.match(segment)) or '/'
+
+
+class RequestHooks:
+    """
+    Base class of request hooks, override methods you need.
+    Hooks are called for every attempt of every request of AsyncYClientsAPI
+    """
+
+    def on_request(self, event: RequestEvent):
+        """ Called right before the request is sent """
+
+    def on_response(self, event: RequestEvent):
+        """ Called when response is received, including 4xx/5xx responses """
+
+    def on_error(self, event: RequestEvent):
+        """ Called when request failed with exception or was cancelled, event.error is set """
+
+
+class DebugHooks(RequestHooks):
+    """ Prints every request, used by AsyncYClientsAPI.show_debugging() """
+
+    def on_response(self, event: RequestEvent):
+        print(f"{event.method} {event.url} {event.status_code} obtained in {event.elapsed:.3f} sec")
+
+    def on_error(self, event: RequestEvent):
+        print(f"{event.method} {event.url} failed in {event.elapsed:.3f} sec with {event.error!r}")
+
+
+class MetricsCollector(RequestHooks):
+    """
+    In-memory metrics of requests by endpoint: latency histogram and percentiles,
+     received bytes, status codes, errors, retries, rate limiter wait and in-flight requests
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple = BUCKETS, samples: int = 10000):
+        """
+        :param buckets: upper bounds of latency histogram buckets in seconds
+        :param samples: number of the latest latencies of every endpoint kept for percentiles
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.samples = samples
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.__histograms = collections.defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.__latency_sum = collections.defaultdict(float)
+        self.__latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.samples))
+        self.__bytes = collections.Counter()
+        self.__statuses = collections.Counter()
+        self.__errors = collections.Counter()
+        self.__retries = collections.Counter()
+        self.__wait_sum = collections.defaultdict(float)
+
+    def on_request(self, event: RequestEvent):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.__wait_sum[event.endpoint] += event.wait
+        if event.attempt:
+            self.__retries[event.endpoint] += 1
+
+    def on_response(self, event: RequestEvent):
+        self.in_flight -= 1
+        self.__observe(event)
+        self.__bytes[event.endpoint] += event.bytes_received
+        self.__statuses[event.endpoint, event.status_code] += 1
+
+    def on_error(self, event: RequestEvent):
+        self.in_flight -= 1
+        self.__observe(event)
+        self.__errors[event.endpoint, type(event.error).__name__] += 1
+
+    def __observe(self, event: RequestEvent):
+        self.__histograms[event.endpoint][bisect.bisect_left(self.buckets, event.elapsed)] += 1
+        self.__latency_sum[event.endpoint] += event.elapsed
+        self.__latencies[event.endpoint].append(event.elapsed)
+
+    def reset(self):
+        self.__init__(self.buckets, self.samples)
+
+    @staticmethod
+    def __percentile(values: list, percent: float) -> float:
+        """ Nearest-rank percentile of sorted values """
+        index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+        return values[index]
+
+    def summary(self) -> dict:
+        """
+        :return: dictionary with endpoint as key and dictionary with keys as value:
+            count, mean, p50, p90, p99, max (seconds), bytes_received, statuses, errors, retries, wait
+        """
+        result = {}
+        for endpoint, latencies in self.__latencies.items():
+            values = sorted(latencies)
+            count = sum(self.__histograms[endpoint])
+            result[endpoint] = {
+                'count': count,
+                'mean': self.__latency_sum[endpoint] / count,
+                'p50': self.__percentile(values, 50),
+                'p90': self.__percentile(values, 90),
+                'p99': self.__percentile(values, 99),
+                'max': values[-1],
+                'bytes_received': self.__bytes[endpoint],
+                'statuses': {status: n for (name, status), n in self.__statuses.items() if name == endpoint},
+                'errors': {error: n for (name, error), n in self.__errors.items() if name == endpoint},
+                'retries': self.__retries[endpoint],
+                'wait': self.__wait_sum[endpoint],
+            }
+        return result
+
+    def prometheus(self, prefix: str = 'yclients') -> str:
+        """ :return: metrics in Prometheus text exposition format """
+        lines = [f"# HELP {prefix}_request_duration_seconds Request latency by endpoint",
+                 f"# TYPE {prefix}_request_duration_seconds histogram"]
+        for endpoint, histogram in sorted(self.__histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                         f'{self.__latency_sum[endpoint]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+        lines += [f"# HELP {prefix}_response_bytes_total Received response body bytes",
+                  f"# TYPE {prefix}_response_bytes_total counter"]
+        lines += [f'{prefix}_response_bytes_total{{endpoint="{endpoint}"}} {n}'
+                  for endpoint, n in sorted(self.__bytes.items())]
+        lines += [f"# HELP {prefix}_responses_total Responses by status code",
+                  f"# TYPE {prefix}_responses_total counter"]
+        lines += [f'{prefix}_responses_total{{endpoint="{endpoint}",status="{status}"}} {n}'
+                  for (endpoint, status), n in sorted(self.__statuses.items())]
+        lines += [f"# HELP {prefix}_errors_total Failed requests by exception",
+                  f"# TYPE {prefix}_errors_total counter"]
+        lines += [f'{prefix}_errors_total{{endpoint="{endpoint}",error="{error}"}} {n}'
+                  for (endpoint, error), n in sorted(self.__errors.items())]
+        lines += [f"# HELP {prefix}_retries_total Repeated requests",
+                  f"# TYPE {prefix}_retries_total counter"]
+        lines += [f'{prefix}_retries_total{{endpoint="{endpoint}"}} {n}'
+                  for endpoint, n in sorted(self.__retries.items())]
+        lines += [f"# HELP {prefix}_rate_limit_wait_seconds_total Time spent waiting for rate limiter",
+                  f"# TYPE {prefix}_rate_limit_wait_seconds_total counter"]
+        lines += [f'{prefix}_rate_limit_wait_seconds_total{{endpoint="{endpoint}"}} {n}'
+                  for endpoint, n in sorted(self.__wait_sum.items())]
+        lines += [f"# HELP {prefix}_requests_in_flight Requests being sent",
+                  f"# TYPE {prefix}_requests_in_flight gauge",
+                  f"{prefix}_requests_in_flight {self.in_flight}"]
+        return '\n'.join(lines) + '\n'
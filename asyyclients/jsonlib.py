@@ -0,0 +1,26 @@
+# coding=utf-8
+import json
+
+import ujson
+
+JSON_BACKENDS = ('ujson', 'orjson', 'json')
+
+
+def get_loads(backend='ujson'):
+    """
+    :param backend: 'ujson', 'orjson', 'json' (standard library) or function which decodes bytes
+    :return: function which decodes JSON directly from response bytes
+    """
+    if callable(backend):
+        return backend
+    if backend == 'ujson':
+        return ujson.loads
+    if backend == 'orjson':
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError("orjson backend requires orjson, install it with `pip install asyyclients[orjson]`") from e
+        return orjson.loads
+    if backend == 'json':
+        return json.loads
+    raise ValueError(f"json_backend must be one of {JSON_BACKENDS} or a function")
@@ -0,0 +1,199 @@
+# coding=utf-8
+from __future__ import annotations
+
+import asyncio
+import collections
+import functools
+
+import httpx
+
+from .cache import ResponseCache
+from .ratelimit import RateLimiter, Retry
+from .yclients import DEFAULT_LIMITS, AsyncYClientsAPI
+
+
+class FairScheduler:
+    """
+    Runs jobs of many companies with limited concurrency. Jobs are started in turn from every company
+     with pending jobs, so a company with many jobs doesn't delay the others
+    """
+
+    def __init__(self, max_concurrency: int = 10, max_per_company: int = 1):
+        """
+        :param max_concurrency: maximum number of jobs running at once
+        :param max_per_company: maximum number of jobs of one company running at once
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_company = max_per_company
+
+    async def run(self, jobs: dict, return_exceptions: bool = True) -> dict:
+        """
+        :param jobs: dictionary with company id as key and list of coroutine functions without arguments as value
+        :param return_exceptions: put exceptions of failed jobs to results instead of raising the first one
+        :return: dictionary with company id as key and list of job results in the same order as value
+        """
+        queues = {key: collections.deque(enumerate(company_jobs)) for key, company_jobs in jobs.items()}
+        results = {key: [None] * len(company_jobs) for key, company_jobs in jobs.items()}
+        order = collections.deque(key for key, queue in queues.items() if queue)
+        running = {}
+        running_number = collections.Counter()
+        try:
+            while order or running:
+                checked = 0
+                while order and len(running) < self.max_concurrency and checked < len(order):
+                    key = order.popleft()
+                    if running_number[key] >= self.max_per_company:
+                        order.append(key)
+                        checked += 1
+                        continue
+                    index, job = queues[key].popleft()
+                    running[asyncio.ensure_future(job())] = (key, index)
+                    running_number[key] += 1
+                    # company goes to the end of the line after one job is started
+                    if queues[key]:
+                        order.append(key)
+                    checked = 0
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key, index = running.pop(task)
+                    running_number[key] -= 1
+                    if task.exception() is not None and not return_exceptions:
+                        raise task.exception()
+                    results[key][index] = task.exception() or task.result()
+        finally:
+            for task in running:
+                task.cancel()
+        return results
+
+
+class AsyncYClientsManager:
+    """
+    Many companies over one connection pool. Every company gets its own AsyncYClientsAPI
+     with its tokens and rate limit, requests of all the companies share the global rate limit
+    """
+
+    def __init__(self, token: str, language: str = 'ru-RU', limits: httpx.Limits = DEFAULT_LIMITS,
+                 timeout: float | httpx.Timeout = 5.0, http2: bool = False, trust_env: bool = True,
+                 client: httpx.AsyncClient = None, rate_limit: float | RateLimiter = None,
+                 company_rate_limit: float = None, retry: Retry = None, cache: bool | ResponseCache = False,
+                 hooks: list = None, json_backend='ujson', max_concurrency: int = 10, max_per_company: int = 1):
+        """
+        :param token: partner token used for companies added without their own token
+        :param language: value of Accept-Language header
+        :param limits: connection pool limits of the shared client
+        :param timeout: request timeout of the shared client
+        :param http2: enable HTTP/2 (requires httpx[http2])
+        :param trust_env: use proxy settings from environment variables
+        :param client: external httpx.AsyncClient to use instead of creating one,
+            it won't be closed by aclose()
+        :param rate_limit: requests per second of all the companies together for every host or RateLimiter object,
+            no limit by default
+        :param company_rate_limit: requests per second of one company for every host, no limit by default
+        :param retry: retry policy of every company
+        :param cache: cache of every company, True to create ResponseCache() for every company
+            or ResponseCache object shared by all of them
+        :param hooks: list of RequestHooks objects called for requests of all the companies
+        :param json_backend: JSON decoder of every company
+        :param max_concurrency: maximum number of jobs running at once in run() and map()
+        :param max_per_company: maximum number of jobs of one company running at once in run() and map()
+        """
+        self.token = token
+        self.language = language
+        self.client = client or httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, trust_env=trust_env)
+        self.__owns_client = client is None
+        self.rate_limiter = rate_limit if isinstance(rate_limit, RateLimiter) or rate_limit is None \
+            else RateLimiter(rate_limit)
+        self.company_rate_limit = company_rate_limit
+        self.retry = retry
+        self.cache = cache
+        self.hooks = list(hooks or [])
+        self.json_backend = json_backend
+        self.scheduler = FairScheduler(max_concurrency, max_per_company)
+        self.__companies = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """ Close the shared client and release its connections """
+        if self.__owns_client:
+            await self.client.aclose()
+
+    def __getitem__(self, company_id: int) -> AsyncYClientsAPI:
+        return self.__companies[company_id]
+
+    def __contains__(self, company_id: int) -> bool:
+        return company_id in self.__companies
+
+    def __len__(self):
+        return len(self.__companies)
+
+    @property
+    def companies(self) -> list:
+        """ Ids of added companies """
+        return list(self.__companies)
+
+    def add_company(self, company_id: int, form_id: int, token: str = None, user_token: str = None,
+                    rate_limit: float = None) -> AsyncYClientsAPI:
+        """
+        :param company_id: company id
+        :param form_id: booking form id
+        :param token: partner token of the company, manager token if None
+        :param user_token: user token of the company, it can be obtained later with login()
+        :param rate_limit: requests per second of the company for every host, company_rate_limit if None
+        :return: AsyncYClientsAPI of the company using the shared client
+        """
+        company_rate_limit = rate_limit or self.company_rate_limit
+        limiter = RateLimiter(company_rate_limit, parent=self.rate_limiter) \
+            if company_rate_limit or self.rate_limiter is not None else None
+        api = AsyncYClientsAPI(token or self.token, company_id, form_id, language=self.language, client=self.client,
+                               rate_limit=limiter, retry=self.retry, cache=self.cache, hooks=self.hooks,
+                               json_backend=self.json_backend)
+        if user_token:
+            api.update_user_token(user_token)
+        self.__companies[company_id] = api
+        return api
+
+    def remove_company(self, company_id: int):
+        self.__companies.pop(company_id, None)
+
+    async def login(self, company_id: int, login: str, password: str) -> str:
+        """
+        Obtain user token and use it for requests of the company
+        :return: user token
+        """
+        api = self.__companies[company_id]
+        user_token = await api.get_user_token(login, password)
+        api.update_user_token(user_token)
+        return user_token
+
+    async def run(self, jobs: dict, return_exceptions: bool = True) -> dict:
+        """
+        Run jobs of many companies interleaving them fairly
+        :param jobs: dictionary with company id as key and list of functions which take AsyncYClientsAPI
+            of the company and return coroutine as value, for example `lambda api: api.get_clients_data()`
+        :param return_exceptions: put exceptions of failed jobs to results instead of raising the first one
+        :return: dictionary with company id as key and list of job results as value
+        """
+        return await self.scheduler.run({
+            company_id: [functools.partial(job, self.__companies[company_id]) for job in company_jobs]
+            for company_id, company_jobs in jobs.items()
+        }, return_exceptions)
+
+    async def map(self, method: str, *args, company_ids: list = None, return_exceptions: bool = True,
+                  **kwargs) -> dict:
+        """
+        Call the same method of AsyncYClientsAPI for many companies
+        :param method: method name, for example 'get_clients_data'
+        :param company_ids: list of company ids, all the companies if None
+        :param return_exceptions: put exceptions of failed calls to results instead of raising the first one
+        :return: dictionary with company id as key and method result as value
+        """
+        results = await self.run({
+            company_id: [lambda api: getattr(api, method)(*args, **kwargs)]
+            for company_id in company_ids or self.__companies
+        }, return_exceptions)
+        return {company_id: company_results[0] for company_id, company_results in results.items()}
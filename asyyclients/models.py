@@ -0,0 +1,172 @@
+# coding=utf-8
+from __future__ import annotations
+
+import datetime
+
+from .sync import parse_change_date
+
+
+class _Lazy:
+    """
+    Descriptor which keeps raw value in the slot _<name> and replaces it
+     with parsed value on the first access
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = '_' + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if self.is_raw(value):
+            value = self.parse(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+    def is_raw(self, value) -> bool:
+        raise NotImplementedError
+
+    def parse(self, value):
+        raise NotImplementedError
+
+
+class _LazyDatetime(_Lazy):
+    """ iso8601 string parsed to timezone aware datetime """
+
+    def is_raw(self, value) -> bool:
+        return isinstance(value, str)
+
+    def parse(self, value) -> datetime.datetime | None:
+        return parse_change_date(value)
+
+
+class _LazyModel(_Lazy):
+    """ dictionary parsed to model """
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def is_raw(self, value) -> bool:
+        return isinstance(value, dict)
+
+    def parse(self, value):
+        return _MODELS[self.model].from_dict(value)
+
+
+class _LazyModelList(_LazyModel):
+    """ list of dictionaries parsed to list of models """
+
+    def is_raw(self, value) -> bool:
+        return isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+
+    def parse(self, value) -> list:
+        return _MODELS[self.model].from_list(value)
+
+
+class Model:
+    """
+    Base class of response models. Models keep only the fields listed in FIELDS in slots,
+     nested objects and dates are parsed on the first access
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+    LAZY_FIELDS = ()
+
+    def __init__(self, **kwargs):
+        for name in self.FIELDS + self.LAZY_FIELDS:
+            setattr(self, name, kwargs.get(name))
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """ :param data: dictionary from API response """
+        model = cls.__new__(cls)
+        for name in cls.FIELDS:
+            setattr(model, name, data.get(name))
+        for name in cls.LAZY_FIELDS:
+            # raw value is stored, it is parsed by descriptor when needed
+            setattr(model, '_' + name, data.get(name))
+        return model
+
+    @classmethod
+    def from_list(cls, data_list: list) -> list:
+        return [cls.from_dict(data) for data in data_list or []]
+
+    def to_dict(self) -> dict:
+        """ Dictionary with all the fields, nested models are converted too """
+        result = {name: getattr(self, name) for name in self.FIELDS + self.LAZY_FIELDS}
+        for name, value in result.items():
+            if isinstance(value, Model):
+                result[name] = value.to_dict()
+            elif isinstance(value, list) and value and isinstance(value[0], Model):
+                result[name] = [item.to_dict() for item in value]
+        return result
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS[:2])
+        return f"{type(self).__name__}({fields})"
+
+
+class Staff(Model):
+    FIELDS = ('id', 'name', 'api_id', 'specialization', 'position', 'bookable', 'avatar', 'avatar_big',
+              'rating', 'votes_count', 'seance_date')
+    __slots__ = FIELDS
+
+
+class Service(Model):
+    FIELDS = ('id', 'title', 'category_id', 'cost', 'manual_cost', 'cost_per_unit', 'discount', 'first_cost',
+              'amount', 'price_min', 'price_max', 'seance_length')
+    __slots__ = FIELDS
+
+
+class Slot(Model):
+    FIELDS = ('time', 'seance_length', 'sum_length')
+    LAZY_FIELDS = ('datetime',)
+    __slots__ = FIELDS + ('_datetime',)
+
+    datetime = _LazyDatetime()
+
+
+class Client(Model):
+    FIELDS = ('id', 'name', 'phone', 'email', 'card', 'birth_date', 'comment', 'discount', 'visits',
+              'sex_id', 'sex', 'sms_check', 'sms_bot', 'spent', 'paid', 'balance', 'importance_id',
+              'importance', 'categories', 'custom_fields', 'success_visits_count', 'fail_visits_count')
+    LAZY_FIELDS = ('last_change_date',)
+    __slots__ = FIELDS + ('_last_change_date',)
+
+    last_change_date = _LazyDatetime()
+
+
+class Visit(Model):
+    FIELDS = ('id', 'company_id', 'staff_id', 'comer', 'clients_count', 'date', 'comment', 'online',
+              'visit_attendance', 'attendance', 'confirmed', 'seance_length', 'length', 'sms_before', 'sms_now',
+              'sms_now_text', 'email_now', 'notified', 'master_request', 'api_id', 'from_url', 'review_requested',
+              'visit_id', 'created_user_id', 'deleted', 'paid_full', 'prepaid', 'prepaid_confirmed',
+              'custom_color', 'custom_font_color', 'goods_transactions', 'documents', 'record_labels',
+              'activity_id', 'custom_fields', 'is_sale_bill_printed')
+    LAZY_FIELDS = ('datetime', 'create_date', 'last_change_date', 'staff', 'client', 'services')
+    __slots__ = FIELDS + tuple('_' + name for name in LAZY_FIELDS)
+
+    datetime = _LazyDatetime()
+    create_date = _LazyDatetime()
+    last_change_date = _LazyDatetime()
+    staff = _LazyModel('Staff')
+    client = _LazyModel('Client')
+    services = _LazyModelList('Service')
+
+    @property
+    def client_id(self) -> int | None:
+        """ Client id without parsing client model """
+        client = self._client
+        return client.get('id') if isinstance(client, dict) else getattr(client, 'id', None)
+
+
+_MODELS = {model.__name__: model for model in (Staff, Service, Slot, Client, Visit)}
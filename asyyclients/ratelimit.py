@@ -0,0 +1,150 @@
+# coding=utf-8
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import random
+import time
+
+import httpx
+
+
+class TokenBucket:
+    """ Token bucket which allows `rate` requests per second with bursts up to `capacity` """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        :param rate: number of tokens added per second
+        :param capacity: maximum number of tokens, equal to rate (but at least 1) by default
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.__tokens = self.capacity
+        self.__updated = time.monotonic()
+        self.__lock = asyncio.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    async def acquire(self) -> float:
+        """
+        Wait until a token is available and take it
+        :return: time spent waiting in seconds
+        """
+        st = time.monotonic()
+        # the lock makes waiters take tokens in the order they came
+        async with self.__lock:
+            self.__refill()
+            while self.__tokens < 1:
+                await asyncio.sleep((1 - self.__tokens) / self.rate)
+                self.__refill()
+            self.__tokens -= 1
+        return time.monotonic() - st
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter with a separate token bucket for every host,
+     so requests to n{form_id}.yclients.com and api.yclients.com
+     don't use each other's budget
+    """
+
+    def __init__(self, rate: float = None, host_rates: dict = None, burst: float = None,
+                 parent: 'RateLimiter' = None):
+        """
+        :param rate: requests per second for every host which is not in host_rates,
+            None means no limit
+        :param host_rates: dictionary with host as key and requests per second as value
+        :param burst: bucket capacity, equal to the rate by default
+        :param parent: limiter shared with other limiters, for example global budget of many companies,
+            it is acquired after this one
+        """
+        self.rate = rate
+        self.host_rates = dict(host_rates or {})
+        self.burst = burst
+        self.parent = parent
+        self.__buckets = {}
+
+    def __get_bucket(self, host: str) -> TokenBucket | None:
+        if host not in self.__buckets:
+            rate = self.host_rates.get(host, self.rate)
+            self.__buckets[host] = TokenBucket(rate, self.burst) if rate else None
+        return self.__buckets[host]
+
+    async def acquire(self, host: str) -> float:
+        """
+        Wait for permission to send a request to host
+        :param host: request host
+        :return: time spent waiting in seconds
+        """
+        bucket = self.__get_bucket(host)
+        wait = await bucket.acquire() if bucket is not None else 0.0
+        if self.parent is not None:
+            wait += await self.parent.acquire(host)
+        return wait
+
+
+class Retry:
+    """ Retry policy with exponential backoff and full jitter """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    def __init__(self, max_retries: int = 3, backoff_factor: float = 0.5, max_backoff: float = 30.0,
+                 statuses: frozenset = RETRY_STATUSES):
+        """
+        :param max_retries: how many times request can be repeated, 0 disables retries
+        :param backoff_factor: first delay upper bound in seconds, it doubles on every attempt
+        :param max_backoff: maximum delay in seconds
+        :param statuses: response status codes which are retried
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+
+    def is_retryable_response(self, method: str, response: httpx.Response) -> bool:
+        """
+        429 means request wasn't processed, so it is safe to repeat any request,
+         other statuses are retried only for idempotent methods
+         to avoid for example making the same booking twice
+        """
+        if response.status_code not in self.statuses:
+            return False
+        return response.status_code == 429 or method.upper() in self.IDEMPOTENT_METHODS
+
+    def is_retryable_error(self, method: str, error: httpx.TransportError) -> bool:
+        """ Failed connection means request wasn't sent, other errors are retried only for idempotent methods """
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)) \
+            or method.upper() in self.IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        """
+        :param attempt: number of the failed attempt starting from 0
+        :param response: failed response, its Retry-After header is honored
+        :return: delay before the next attempt in seconds
+        """
+        retry_after = self.__retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def __retry_after(response: httpx.Response) -> float | None:
+        """ Retry-After header value in seconds, it can be a number or HTTP date """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_date.timestamp() - time.time(), 0.0)
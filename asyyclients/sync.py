@@ -0,0 +1,112 @@
+# coding=utf-8
+from __future__ import annotations
+
+import datetime
+import sqlite3
+
+import ujson
+
+from .dates import parse_datetime
+
+
+def parse_change_date(value: str) -> datetime.datetime | None:
+    """ last_change_date parser, datetime without offset is considered UTC, None if value is invalid """
+    if not value:
+        return None
+    try:
+        dt = parse_datetime(value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+class SQLiteCheckpointStore:
+    """
+    Local SQLite storage of synchronized records and checkpoints.
+    Records of every entity ('clients', 'visits') are kept by id together with last_change_date,
+     checkpoint of entity is the latest last_change_date seen during synchronization
+    """
+
+    def __init__(self, path: str = "yclients_sync.sqlite3"):
+        """
+        :param path: path to the database file, ':memory:' for in-memory database
+        """
+        self.path = path
+        self.__connection = sqlite3.connect(path)
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                entity TEXT PRIMARY KEY,
+                high_water_mark TEXT NOT NULL,
+                synced_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                entity TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                last_change_date TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (entity, id)
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.__connection.close()
+
+    def get_checkpoint(self, entity: str) -> str | None:
+        """ :return: last_change_date of the latest synchronized record of entity or None """
+        row = self.__connection.execute("SELECT high_water_mark FROM checkpoints WHERE entity = ?",
+                                        (entity,)).fetchone()
+        return row[0] if row else None
+
+    def set_checkpoint(self, entity: str, high_water_mark: str):
+        synced_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self.__connection:
+            self.__connection.execute("INSERT INTO checkpoints (entity, high_water_mark, synced_at) VALUES (?, ?, ?) "
+                                      "ON CONFLICT (entity) DO UPDATE SET high_water_mark = excluded.high_water_mark, "
+                                      "synced_at = excluded.synced_at",
+                                      (entity, high_water_mark, synced_at))
+
+    def upsert(self, entity: str, records: list) -> list:
+        """
+        Insert new records and replace changed ones
+        :param entity: entity name
+        :param records: list of dictionaries with 'id' and 'last_change_date'
+        :return: records which were new or had different last_change_date
+        """
+        known = {}
+        # sqlite limits number of query parameters
+        for start in range(0, len(records), 500):
+            ids = [record['id'] for record in records[start:start + 500]]
+            known.update(self.__connection.execute(
+                f"SELECT id, last_change_date FROM records WHERE entity = ? AND id IN ({','.join('?' * len(ids))})",
+                (entity, *ids)).fetchall())
+        changed = [record for record in records
+                   if record['id'] not in known or known[record['id']] != record.get('last_change_date')]
+        with self.__connection:
+            self.__connection.executemany("INSERT INTO records (entity, id, last_change_date, data) VALUES (?, ?, ?, ?) "
+                                          "ON CONFLICT (entity, id) DO UPDATE SET "
+                                          "last_change_date = excluded.last_change_date, data = excluded.data",
+                                          [(entity, record['id'], record.get('last_change_date'),
+                                            ujson.dumps(record, ensure_ascii=False)) for record in changed])
+        return changed
+
+    def clear(self, entity: str):
+        """ Drop all the records and checkpoint of entity """
+        with self.__connection:
+            self.__connection.execute("DELETE FROM records WHERE entity = ?", (entity,))
+            self.__connection.execute("DELETE FROM checkpoints WHERE entity = ?", (entity,))
+
+    def ids(self, entity: str) -> list:
+        return [row[0] for row in self.__connection.execute("SELECT id FROM records WHERE entity = ? ORDER BY id",
+                                                            (entity,))]
+
+    def records(self, entity: str):
+        """ :return: generator of stored records of entity ordered by id """
+        cursor = self.__connection.execute("SELECT data FROM records WHERE entity = ? ORDER BY id", (entity,))
+        for row in cursor:
+            yield ujson.loads(row[0])
@@ -1,14 +1,66 @@
 # coding=utf-8
+from __future__ import annotations
+
+import asyncio
+import collections
 import datetime
+import math
 import time
+from typing import TYPE_CHECKING, Callable
+
 import httpx
-import pandas as pd
 import ujson
 
+from .availability import AvailabilityMatrix
+from .booking import BookingResult, booking_error
+from .cache import CacheKey, ResponseCache
+from .dates import parse_datetime, to_day
+from .export import CLIENT_FIELDS, VISIT_FIELDS, RecordWriter
+from .hooks import DebugHooks, RequestEvent, RequestHooks
+from .jsonlib import get_loads
+from .models import Client, Service, Slot, Staff, Visit
+from .ratelimit import RateLimiter, Retry
+from .sync import SQLiteCheckpointStore, parse_change_date
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# default pool for the shared client: keep connections to n{form_id}.yclients.com
+# and api.yclients.com alive between calls instead of reconnecting every time
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
 
 class AsyncYClientsAPI:
 
-    def __init__(self, token: str, company_id: int, form_id: int, language: str = 'ru-RU'):
+    def __init__(self, token: str, company_id: int, form_id: int, language: str = 'ru-RU',
+                 limits: httpx.Limits = DEFAULT_LIMITS, timeout: float | httpx.Timeout = 5.0,
+                 http2: bool = False, trust_env: bool = True, client: httpx.AsyncClient = None,
+                 rate_limit: float | RateLimiter = None, retry: Retry = None,
+                 cache: bool | ResponseCache = False, hooks: list = None,
+                 json_backend: str | Callable = 'ujson'):
+        """
+        :param token: partner token
+        :param company_id: company id
+        :param form_id: booking form id
+        :param language: value of Accept-Language header
+        :param limits: connection pool limits of the shared client
+        :param timeout: request timeout of the shared client
+        :param http2: enable HTTP/2 (requires httpx[http2])
+        :param trust_env: use proxy settings from environment variables
+        :param client: external httpx.AsyncClient to use instead of creating one,
+            it won't be closed by aclose()
+        :param rate_limit: requests per second for every host or RateLimiter object,
+            no limit by default
+        :param retry: retry policy for 429/5xx responses and connection errors,
+            Retry() by default, use Retry(max_retries=0) to disable retries
+        :param cache: cache responses of get_staff, get_services, get_available_days
+            and get_available_times, True to use ResponseCache() or ResponseCache object
+        :param hooks: list of RequestHooks objects called for every request,
+            for example MetricsCollector()
+        :param json_backend: 'ujson', 'orjson' (requires orjson), 'json' or function which decodes
+            response bytes, responses are decoded from bytes without converting them to str
+        """
         self.company_id = company_id
         self.form_id = form_id
         self.headers = {
@@ -20,98 +72,404 @@ class AsyncYClientsAPI:
         # if __show_debugging==True code will show debugging process
         self.__show_debugging = False
 
+        self.__client_options = dict(limits=limits, timeout=timeout, http2=http2, trust_env=trust_env)
+        self.__client = client
+        self.__owns_client = client is None
+        self.__rate_limiter = rate_limit if isinstance(rate_limit, RateLimiter) or rate_limit is None \
+            else RateLimiter(rate_limit)
+        self.__retry = retry or Retry()
+        self.cache = ResponseCache() if cache is True else cache or None
+        self.hooks = list(hooks or [])
+        self.__debug_hooks = DebugHooks()
+        self.__in_flight = 0
+        self.__loads = get_loads(json_backend)
+
+    """CONNECTION"""
+
+    async def __aenter__(self):
+        self.__get_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """ Close the shared client and release its connections """
+        if self.__owns_client and self.__client is not None:
+            await self.__client.aclose()
+            self.__client = None
+
+    def __get_client(self) -> httpx.AsyncClient:
+        """ Return the shared client, creating it on first use """
+        if self.__client is None or (self.__owns_client and self.__client.is_closed):
+            self.__client = httpx.AsyncClient(**self.__client_options)
+        return self.__client
+
+    async def __request(self, method: str, url: str, session: httpx.AsyncClient = None, **kwargs) -> httpx.Response:
+        """
+        Send request through the shared client respecting rate limit.
+        Responses with 429/5xx status and connection errors are retried with backoff,
+         httpx.HTTPStatusError is raised if all the attempts failed or
+         the request can't be repeated safely
+        :param method: http method
+        :param url: request url
+        :param session: client to use instead of the shared one
+        :return: httpx.Response
+        """
+        session = session or self.__get_client()
+        host = httpx.URL(url).host
+        attempt = 0
+        while True:
+            event = RequestEvent(method, url, attempt)
+            if self.__rate_limiter is not None:
+                event.wait = await self.__rate_limiter.acquire(host)
+            try:
+                response = await self.__send(session, event, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.__retry.max_retries or not self.__retry.is_retryable_error(method, e):
+                    raise
+                delay = self.__retry.backoff(attempt)
+                reason = repr(e)
+            else:
+                if response.status_code not in self.__retry.statuses:
+                    return response
+                if attempt >= self.__retry.max_retries or not self.__retry.is_retryable_response(method, response):
+                    response.raise_for_status()
+                delay = self.__retry.backoff(attempt, response)
+                reason = f"status {response.status_code}"
+            attempt += 1
+            if self.__show_debugging:
+                print(f"Request {method} {url} failed with {reason}, retry {attempt} in {delay:.2f} sec")
+            await asyncio.sleep(delay)
+
+    async def __send(self, session: httpx.AsyncClient, event: RequestEvent, **kwargs) -> httpx.Response:
+        """ Send one request and call hooks """
+        self.__in_flight += 1
+        event.in_flight = self.__in_flight
+        for hook in self.hooks:
+            hook.on_request(event)
+        st = time.perf_counter()
+        try:
+            response = await session.request(event.method, event.url, headers=self.headers, **kwargs)
+        except BaseException as e:
+            # cancelled requests are reported too, so hooks don't count them as running forever
+            event.elapsed = time.perf_counter() - st
+            event.error = e
+            for hook in self.hooks:
+                hook.on_error(event)
+            raise
+        finally:
+            self.__in_flight -= 1
+        event.elapsed = time.perf_counter() - st
+        event.status_code = response.status_code
+        event.bytes_received = len(response.content)
+        for hook in self.hooks:
+            hook.on_response(event)
+        return response
+
+    def add_hooks(self, hooks: RequestHooks):
+        """ Start calling hooks for every request """
+        if hooks not in self.hooks:
+            self.hooks.append(hooks)
+
+    def remove_hooks(self, hooks: RequestHooks):
+        if hooks in self.hooks:
+            self.hooks.remove(hooks)
+
+    @staticmethod
+    def __pages_number(items_number: int, items_per_page: int) -> int:
+        """ Number of pages needed to load items_number items, at least one """
+        return max(math.ceil(items_number / items_per_page), 1)
+
+    async def __fetch_pages(self, fetch_page, items_per_page: int, semaphore: asyncio.Semaphore,
+                            description: str) -> list:
+        """
+        Load the first page to learn total number of items, then load the rest
+        of the pages concurrently, but not more than semaphore allows at once
+        :param fetch_page: coroutine function which takes page number and returns page data
+        :param items_per_page: size of the page
+        :param semaphore: limits number of simultaneous requests
+        :param description: what is loaded, used in debugging prints
+        :return: list of pages data in page order
+        """
+        async def fetch(page_number: int) -> dict:
+            async with semaphore:
+                return await fetch_page(page_number)
+
+        first_page = await fetch(1)
+        items_number = first_page['meta']['total_count']
+        pages_number = self.__pages_number(items_number, items_per_page)
+        if self.__show_debugging:
+            print(f"There are {items_number} {description} in the system")
+            if pages_number > 1:
+                print(f"{pages_number} pages will be loaded")
+
+        other_pages = await asyncio.gather(*(fetch(page) for page in range(2, pages_number + 1)))
+        return [first_page, *other_pages]
+
+    async def __iter_pages(self, fetch_page, items_per_page: int, prefetch: int, description: str):
+        """
+        Async generator of pages in page order. While the current page is processed
+         up to prefetch next pages are loaded in background
+        :param fetch_page: coroutine function which takes page number and returns page data
+        :param items_per_page: size of the page
+        :param prefetch: how many next pages are loaded in advance, 0 to load page only when it's needed
+        :param description: what is loaded, used in debugging prints
+        :return: async generator of pages data
+        """
+        first_page = await fetch_page(1)
+        items_number = first_page['meta']['total_count']
+        pages_number = self.__pages_number(items_number, items_per_page)
+        if self.__show_debugging:
+            print(f"There are {items_number} {description} in the system")
+            if pages_number > 1:
+                print(f"{pages_number} pages will be loaded")
+
+        prefetch = max(prefetch, 0)
+        pending = collections.deque()
+        next_page = 2
+        try:
+            # start loading next pages before first page is processed
+            while next_page <= pages_number and len(pending) < prefetch:
+                pending.append(asyncio.ensure_future(fetch_page(next_page)))
+                next_page += 1
+            yield first_page
+            while pending or next_page <= pages_number:
+                while next_page <= pages_number and len(pending) <= prefetch:
+                    pending.append(asyncio.ensure_future(fetch_page(next_page)))
+                    next_page += 1
+                page = await pending.popleft()
+                yield page
+        finally:
+            # consumer stopped iteration early
+            for task in pending:
+                task.cancel()
+
+    async def __get_json(self, url: str, querystring: dict = None):
+        response = await self.__request("GET", url, params=querystring)
+        return self.__loads(response.content)
+
+    async def __cached_get(self, endpoint: str, url: str, querystring: dict, staff_id=None, date_time=None):
+        """
+        GET request which response is cached if cache is enabled
+        :param endpoint: endpoint name used for TTL lookup
+        :param url: request url
+        :param querystring: request parameters
+        :param staff_id: staff the response depends on
+        :param date_time: date or datetime the response depends on
+        :return: decoded response
+        """
+        if self.cache is None:
+            return await self.__get_json(url, querystring)
+        key = CacheKey.build(endpoint, staff_id, to_day(date_time), {'url': url, **querystring})
+        return await self.cache.get_or_fetch(key, lambda: self.__get_json(url, querystring))
+
     @staticmethod
     def datetime_parser(date_time: str) -> datetime.datetime:
-        """ datetime in iso8601 format parser """
-        a, b = date_time.split('+')
-        dt = datetime.datetime.strptime(a, "%Y-%m-%dT%H:%M:%S")
-        return dt
+        """ datetime in iso8601 format parser, timezone offset is preserved """
+        return parse_datetime(date_time)
 
-    async def book(self, booking_id: int, fullname: str, phone: str, email: str, staff_id: int,
-                   date_time: str | datetime.datetime,
-                   service_id: int = None, comment: str = None) -> (True, None) or (False, Exception):
-        """ Make booking """
+    @staticmethod
+    def datetime_column_parser(date_times: 'pd.Series', utc: bool = False) -> 'pd.Series':
+        """
+        Vectorised parser of iso8601 datetime column, requires pandas
+        :param date_times: pd.Series of iso8601 strings
+        :param utc: convert to UTC, column with different offsets is always converted to UTC
+        :return: pd.Series of timezone aware datetimes
+        """
+        from . import frames
+        return frames.datetime_column_parser(date_times, utc)
+
+    async def __book_record(self, bookings: list) -> list:
+        """
+        Send bookings of one client as appointments of one book_record request
+        :param bookings: list of dictionaries with book() arguments, client fields are taken from the first one
+        :return: list of BookingResult in the same order
+        """
         url = "https://n{}.yclients.com/api/v1/book_record/{}/".format(self.form_id, self.company_id)
+        first = bookings[0]
+        appointments = []
+        for i, booking in enumerate(bookings):
+            date_time = booking['date_time']
+            service_id = booking.get('service_id')
+            appointments.append({
+                # packed appointments get their position as id to match created records
+                "id": booking.get('booking_id', 0) if len(bookings) == 1 else i + 1,
+                "services": [int(service_id)] if service_id else [],
+                "staff_id": int(booking.get('staff_id') or 0),
+                "datetime": date_time.isoformat() if isinstance(date_time, datetime.datetime) else date_time
+            })
         payload = {
-            "phone": phone,
-            "fullname": fullname,
-            "email": email,
-            "comment": comment,
+            "phone": first.get('phone'),
+            "fullname": first.get('fullname'),
+            "email": first.get('email'),
+            "comment": first.get('comment'),
             "notify_by_email": 0,
-            "appointments": [{
-                "id": booking_id,
-                "services": [int(service_id)],
-                "staff_id": int(staff_id or 0),
-                "datetime": date_time
-            }]
+            "appointments": appointments
         }
-        async with httpx.AsyncClient() as c:
-            response = await c.post(url, json=payload, headers=self.headers)
-        res = ujson.loads(response.text)
-        if isinstance(res, dict) and res.get('errors'):
-            return False, res.get('errors', {}).get('message', '')
-        return True, ''
+        try:
+            response = await self.__request("POST", url, json=payload)
+        except httpx.HTTPStatusError as e:
+            return [BookingResult(booking, False, e.response.status_code, message=f"status {e.response.status_code}")
+                    for booking in bookings]
+        except httpx.TransportError as e:
+            return [BookingResult(booking, False, message=repr(e)) for booking in bookings]
+
+        try:
+            res = self.__loads(response.content) if response.content else None
+        except ValueError:
+            # for example html error page of a proxy
+            return [BookingResult(booking, False, response.status_code,
+                                  message=f"status {response.status_code}, response is not JSON")
+                    for booking in bookings]
+        error = booking_error(response.status_code, res)
+        if error is not None:
+            error_code, message = error
+            return [BookingResult(booking, False, response.status_code, error_code, message) for booking in bookings]
+
+        records = res.get('data') if isinstance(res, dict) else res
+        records = records if isinstance(records, list) else []
+        records_by_id = {record.get('id'): record for record in records}
+        results = []
+        for position, (booking, appointment) in enumerate(zip(bookings, appointments)):
+            record = records_by_id.get(appointment['id']) or (records[position] if position < len(records) else {})
+            results.append(BookingResult(booking, True, response.status_code, record_id=record.get('record_id'),
+                                         record_hash=record.get('record_hash')))
+            if self.cache is not None:
+                self.cache.invalidate_availability(booking.get('staff_id'), to_day(booking['date_time']))
+        return results
+
+    async def book(self, booking_id: int, fullname: str, phone: str, email: str, staff_id: int,
+                   date_time: str | datetime.datetime,
+                   service_id: int = None, comment: str = None) -> (True, None) or (False, Exception):
+        """ Make booking """
+        result, = await self.__book_record([dict(booking_id=booking_id, fullname=fullname, phone=phone, email=email,
+                                                 staff_id=staff_id, date_time=date_time, service_id=service_id,
+                                                 comment=comment)])
+        return result.success, result.message
+
+    async def book_many(self, bookings: list, max_concurrency: int = 5, group_by_client: bool = False) -> list:
+        """
+        Make many bookings concurrently, failed bookings don't stop the others
+        :param bookings: list of dictionaries with book() arguments: fullname, phone, email, staff_id,
+            date_time and optional booking_id, service_id, comment
+        :param max_concurrency: maximum number of simultaneous book_record requests
+        :param group_by_client: send bookings with the same fullname, phone, email and comment
+            as appointments of one request, all of them fail if one appointment can't be booked
+        :return: list of BookingResult in the order of bookings
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        groups = {}
+        for index, booking in enumerate(bookings):
+            key = (booking.get('fullname'), booking.get('phone'), booking.get('email'), booking.get('comment')) \
+                if group_by_client else index
+            groups.setdefault(key, []).append(index)
+        results = [None] * len(bookings)
+
+        async def submit(indexes: list):
+            async with semaphore:
+                group_results = await self.__book_record([bookings[index] for index in indexes])
+            for index, result in zip(indexes, group_results):
+                results[index] = result
+
+        await asyncio.gather(*(submit(indexes) for indexes in groups.values()))
+        if self.__show_debugging:
+            print(f"{sum(result.success for result in results)} of {len(bookings)} bookings made "
+                  f"in {len(groups)} requests")
+        return results
 
     async def get_staff_info(self, staff_id: int) -> dict:
         """ Return dict with info about specific staff"""
         url = "https://n{}.yclients.com/api/v1/staff/{}/{}".format(self.form_id, self.company_id, staff_id)
-        async with httpx.AsyncClient() as c:
-            response = await c.get(url, headers=self.headers)
-        return ujson.loads(response.text)
+        response = await self.__request("GET", url)
+        return self.__loads(response.content)
 
     async def get_service_info(self, service_id: int) -> dict:
         """ Return dict with info about specific service"""
         url = "https://n{}.yclients.com/api/v1/services/{}/{}".format(self.form_id, self.company_id, service_id)
-        async with httpx.AsyncClient() as c:
-            response = await c.get(url, headers=self.headers)
-        return ujson.loads(response.text)
+        response = await self.__request("GET", url)
+        return self.__loads(response.content)
 
-    async def get_staff(self, service_id: int = None, date_time=None) -> dict:
-        """ Return dict of staff for specific service and date"""
+    async def get_staff(self, service_id: int = None, date_time=None, raw: bool = True) -> dict | list:
+        """ Return dict of staff for specific service and date, or list of Staff if raw is False"""
         url = "https://n{}.yclients.com/api/v1/book_staff/{}".format(self.form_id, self.company_id)
         querystring = {"service_ids[]": int(service_id)} if service_id else {}
         querystring.update({"datetime": date_time} if date_time else {})
-        async with httpx.AsyncClient() as c:
-            response = await c.get(url, headers=self.headers, params=querystring)
-        return ujson.loads(response.text)
+        res = await self.__cached_get("book_staff", url, querystring, date_time=date_time)
+        return res if raw else Staff.from_list(res.get('data'))
 
-    async def get_services(self, staff_id: int = None, date_time: int = None) -> dict:
-        """ Return list of services for specific staff and date"""
+    async def get_services(self, staff_id: int = None, date_time: int = None, raw: bool = True) -> dict | list:
+        """ Return list of services for specific staff and date, or list of Service if raw is False"""
         url = "https://n{}.yclients.com/api/v1/book_services/{}".format(self.form_id, self.company_id)
         querystring = {"staff_id": int(staff_id)} if staff_id else {}
         querystring.update({"datetime": date_time} if date_time else {})
-        async with httpx.AsyncClient() as c:
-            response = await c.get(url, headers=self.headers, params=querystring)
-        return ujson.loads(response.text)
+        res = await self.__cached_get("book_services", url, querystring, staff_id=staff_id, date_time=date_time)
+        return res if raw else Service.from_list((res.get('data') or {}).get('services'))
 
     async def get_available_days(self, staff_id: int = None, service_id: int = None) -> dict:
         """ Return all available days for specific staff and service"""
         url = "https://n{}.yclients.com/api/v1/book_dates/{}".format(self.form_id, self.company_id)
         querystring = {"staff_id": int(staff_id)} if staff_id else {}
         querystring.update({"service_ids[]": service_id} if service_id else {})
-        async with httpx.AsyncClient() as c:
-            response = await c.get(url, headers=self.headers, params=querystring)
-        return ujson.loads(response.text)
+        return await self.__cached_get("book_dates", url, querystring, staff_id=staff_id)
 
-    async def get_available_times(self, staff_id: int, service_id: int = None, day=None) -> dict:
-        """ Return all available time slots on specific day staff and service"""
+    async def get_available_times(self, staff_id: int, service_id: int = None, day=None,
+                                  raw: bool = True) -> dict | list:
+        """ Return all available time slots on specific day staff and service, or list of Slot if raw is False"""
         url = "https://n{}.yclients.com/api/v1/book_times/{}/{}/{}".format(self.form_id, self.company_id, staff_id, day)
         querystring = {}
         if service_id:
             querystring.update({"service_ids[]": service_id})
-        async with httpx.AsyncClient() as c:
-            response = await c.request("GET", url, headers=self.headers, params=querystring)
-        return ujson.loads(response.text)
+        res = await self.__cached_get("book_times", url, querystring, staff_id=staff_id, date_time=day)
+        return res if raw else Slot.from_list(res.get('data'))
+
+    async def get_availability_matrix(self, staff_ids: list, service_ids: list = None, date_range: tuple = None,
+                                      max_concurrency: int = 10) -> AvailabilityMatrix:
+        """
+        Load available days and time slots of every staff for every service concurrently
+        :param staff_ids: list of staff ids
+        :param service_ids: list of service ids, slots without service if None
+        :param date_range: (start, end) dates in YYYY-MM-DD format or date objects, both inclusive,
+            all available days if None
+        :param max_concurrency: maximum number of simultaneous requests
+        :return: AvailabilityMatrix with slots of every (staff_id, service_id) pair
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        start, end = (to_day(day) for day in date_range) if date_range else (None, None)
+        # repeated ids are loaded once
+        pairs = dict.fromkeys((int(staff_id), int(service_id) if service_id else None)
+                              for staff_id in staff_ids for service_id in service_ids or [None])
+        matrix = AvailabilityMatrix()
+
+        async def limited(request, *args):
+            async with semaphore:
+                return await request(*args)
+
+        async def load(staff_id: int, service_id: int | None):
+            res = await limited(self.get_available_days, staff_id, service_id)
+            days = dict.fromkeys(to_day(day) for day in (res.get('data') or {}).get('booking_dates') or [])
+            days = [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+            times = await asyncio.gather(*(limited(self.get_available_times, staff_id, service_id, day)
+                                           for day in days))
+            for res in times:
+                matrix.add(staff_id, service_id, res.get('data') or [])
+
+        await asyncio.gather(*(load(staff_id, service_id) for staff_id, service_id in pairs))
+        if self.__show_debugging:
+            print(f"{len(matrix)} free slots loaded for {len(pairs)} staff and service pairs")
+        return matrix
 
     """DEBUGGING"""
 
     def show_debugging(self):
         print("Debugging prints turned on")
         self.__show_debugging = True
+        self.add_hooks(self.__debug_hooks)
 
     def hide_debugging(self):
         print("Debugging prints turned off")
         self.__show_debugging = False
+        self.remove_hooks(self.__debug_hooks)
 
     """USER AUTHORIZATION"""
 
@@ -127,9 +485,8 @@ class AsyncYClientsAPI:
             "login": login,
             "password": password
         }
-        async with httpx.AsyncClient() as c:
-            response = await c.post(url, headers=self.headers, params=querystring)
-        user_token = ujson.loads(response.text)['data']['user_token']
+        response = await self.__request("POST", url, params=querystring)
+        user_token = self.__loads(response.content)['data']['user_token']
         if self.__show_debugging:
             print(f"Obtained user token {user_token}")
         return user_token
@@ -141,8 +498,9 @@ class AsyncYClientsAPI:
         :param user_token: user token
         :return:
         """
+        # previous user token is replaced
         self.headers['Authorization'] = \
-            self.headers['Authorization'] + f", User {user_token}"
+            self.headers['Authorization'].split(", User ")[0] + f", User {user_token}"
         if self.__show_debugging:
             print(f"Updated autorisation parameters:"
                   f" {self.headers['Authorization']}")
@@ -153,38 +511,40 @@ class AsyncYClientsAPI:
         """
         url = f"https://api.yclients.com/api/v1/user/permissions/{self.company_id}"
         querystring = {}
-        async with httpx.AsyncClient() as c:
-            response = await c.request("GET", url, headers=self.headers, params=querystring)
-        data = ujson.loads(response.text)['data']
+        response = await self.__request("GET", url, params=querystring)
+        data = self.__loads(response.content)['data']
         print("User permissions:")
         print(ujson.dumps(data, indent=4, sort_keys=True))
         return data
 
     """CLIENTS DATA"""
 
-    async def __get_clients_page(self, page_number: int, session: httpx.AsyncClient, clients_per_page: int) -> dict:
+    async def __get_clients_page(self, page_number: int, session: httpx.AsyncClient | None, clients_per_page: int,
+                                 filters: dict = None) -> dict:
         """
         Yclients api can't return all clients at once and returns in groups
          of maximum size of 200. Those groups are called pages and you can
          choose how many clients it will return
         :param page_number: number of page
-        :param session: httpx.Client() object
+        :param session: httpx.AsyncClient object, the shared client is used if None
         :param clients_per_page: size of the page
+        :param filters: additional request parameters
         :return: data of clients on the page page_number
         """
-        st = time.time()
         url = "https://api.yclients.com/api/v1/clients/{}".format(self.company_id)
         querystring = {}
         querystring.update({"count": clients_per_page})
         querystring.update({"page": page_number})
-        response = await session.get(url, headers=self.headers, params=querystring)
-        if self.__show_debugging:
-            print(f'Clients page {page_number} obtained in {time.time() - st} sec')
-        return ujson.loads(response.text)
+        querystring.update(filters or {})
+        response = await self.__request("GET", url, session=session, params=querystring)
+        return self.__loads(response.content)
 
-    async def get_clients_data(self, clients_per_page: int = 200) -> dict:
+    async def get_clients_data(self, clients_per_page: int = 200, max_concurrency: int = 1, raw: bool = True) -> list:
         """
         :param clients_per_page: size of the page
+        :param max_concurrency: how many pages can be loaded simultaneously
+            after total number of clients is known
+        :param raw: return dictionaries if True, otherwise Client objects
         :return: data of all the clients in the system
             client's parameters:
             'id', 'name', 'phone', 'email', 'card',
@@ -193,74 +553,279 @@ class AsyncYClientsAPI:
                'paid', 'balance', 'importance_id', 'importance',
                 'categories', 'last_change_date', 'custom_fields'
         """
-        async with httpx.AsyncClient(trust_env=False) as session:
-            # In the first request we obtain total number of clients in system
-            first_request = await self.__get_clients_page(1, session, clients_per_page)
-            clients_data_list = first_request['data']
-
-            # total number of clients
-            clients_number = first_request['meta']['total_count']
-
-            # number of pages that we need to request
-            pages_number = int(clients_number / clients_per_page) + 1
-            if self.__show_debugging:
-                print(f"There are {clients_number} clients in the system")
-                if pages_number > 1:
-                    print(f"{pages_number} pages will be loaded")
-
-            if pages_number == 1:
-                return clients_data_list
+        pages = await self.__fetch_pages(lambda page: self.__get_clients_page(page, None, clients_per_page),
+                                         items_per_page=clients_per_page,
+                                         semaphore=asyncio.Semaphore(max_concurrency),
+                                         description="clients")
+        clients_data_list = []
+        for page in pages:
+            clients_data_list.extend(page['data'] if raw else Client.from_list(page['data']))
+        return clients_data_list
 
-            for page in range(2, pages_number + 1):
-                new_page_request = await self.__get_clients_page(page, session, clients_per_page)
-                clients_data_list.extend(new_page_request['data'])
-            return clients_data_list
+    async def iter_clients(self, clients_per_page: int = 200, prefetch: int = 0, batch: bool = False,
+                           raw: bool = True):
+        """
+        Iterate over clients while pages are loaded, so only current and prefetched pages are kept in memory
+            async for client in api.iter_clients(prefetch=2):
+                ...
+        :param clients_per_page: size of the page
+        :param prefetch: how many next pages are loaded in background while current page is processed
+        :param batch: yield list of clients of every page instead of separate clients
+        :param raw: yield dictionaries if True, otherwise Client objects
+        :return: async generator of clients data, see get_clients_data for parameters
+        """
+        async for page in self.__iter_pages(lambda page_number: self.__get_clients_page(page_number, None,
+                                                                                        clients_per_page),
+                                            items_per_page=clients_per_page,
+                                            prefetch=prefetch,
+                                            description="clients"):
+            clients = page['data'] if raw else Client.from_list(page['data'])
+            if batch:
+                yield clients
+            else:
+                for client_data in clients:
+                    yield client_data
 
-    def parse_clients_data(self, clients_data_list: list) -> pd.DataFrame:
+    def parse_clients_data(self, clients_data_list: list) -> 'pd.DataFrame':
         """
+        Build dataframe from all the clients at once, requires pandas:
+            - spent, paid, balance are converted to float
+            - last_change_date is converted to datetime in UTC
+            - categories are replaced with comma separated titles of categories
+            - custom_fields are flattened to custom_fields.<field code> columns
         :param clients_data_list: list of dictionaries with client data
         :return: pd.Dataframe with clients data
         """
-        columns = clients_data_list[0].keys()
-        df = pd.DataFrame(columns=columns)
-        for client_data in clients_data_list:
-            df = df.append(client_data, ignore_index=True)
+        from . import frames
+        df = frames.clients_frame(clients_data_list)
         if self.__show_debugging:
             print("Parsed clients data:")
             print(df)
         return df
 
+    """EXPORT"""
+
+    async def export_clients(self, path: str, file_format: str = 'parquet', clients_per_page: int = 200,
+                             prefetch: int = 1, row_group_size: int = 10000) -> int:
+        """
+        Write all the clients to Parquet or Arrow IPC file while pages are loaded.
+        Requires pyarrow: pip install asyyclients[parquet]
+        :param path: output file path
+        :param file_format: 'parquet' or 'arrow'
+        :param clients_per_page: size of the page
+        :param prefetch: how many next pages are loaded while current page is written
+        :param row_group_size: number of rows in one row group
+        :return: number of written clients
+        """
+        with RecordWriter(path, CLIENT_FIELDS, file_format, row_group_size) as writer:
+            async for clients in self.iter_clients(clients_per_page, prefetch=prefetch, batch=True):
+                writer.write(clients)
+        if self.__show_debugging:
+            print(f"{writer.rows_number} clients were exported to {path}")
+        return writer.rows_number
+
+    async def export_visits(self, path: str, cids_list: list = None, file_format: str = 'parquet',
+                            visits_per_page: int = 200, prefetch: int = 1, row_group_size: int = 10000) -> int:
+        """
+        Write visits to Parquet or Arrow IPC file while pages are loaded,
+         client id is written to client_id column.
+        Requires pyarrow: pip install asyyclients[parquet]
+        :param path: output file path
+        :param cids_list: list of clients ids, visits of all the clients are exported if None
+        :param file_format: 'parquet' or 'arrow'
+        :param visits_per_page: size of the page
+        :param prefetch: how many next pages are loaded while current page is written
+        :param row_group_size: number of rows in one row group
+        :return: number of written visits
+        """
+        def visits_pages(cid: int | None):
+            return self.__iter_pages(lambda page_number: self.__get_visits_page(cid=cid,
+                                                                                page_number=page_number,
+                                                                                session=None,
+                                                                                visits_per_page=visits_per_page),
+                                     items_per_page=visits_per_page,
+                                     prefetch=prefetch,
+                                     description="visits" if cid is None else f"visits for clients {cid}")
+
+        with RecordWriter(path, VISIT_FIELDS, file_format, row_group_size) as writer:
+            for cid in [None] if cids_list is None else cids_list:
+                async for page in visits_pages(cid):
+                    visits = page['data']
+                    for visit in visits:
+                        visit.setdefault('client_id', (visit.get('client') or {}).get('id'))
+                    writer.write(visits)
+        if self.__show_debugging:
+            print(f"{writer.rows_number} visits were exported to {path}")
+        return writer.rows_number
+
+    """INCREMENTAL SYNC"""
+
+    async def __sync(self, entity: str, fetch_page, items_per_page: int, store: SQLiteCheckpointStore,
+                     full: bool, max_concurrency: int) -> list:
+        """
+        Load records changed after the checkpoint of entity and save them to the store
+        :param entity: entity name in the store
+        :param fetch_page: coroutine function which takes page number and filters and returns page data
+        :param items_per_page: size of the page
+        :param store: checkpoint store
+        :param full: drop stored records and load everything
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :return: records which were added or changed since the previous synchronization
+        """
+        if full:
+            store.clear(entity)
+        checkpoint = store.get_checkpoint(entity)
+        checkpoint_date = parse_change_date(checkpoint)
+        filters = {"changed_after": checkpoint} if checkpoint else {}
+        if self.__show_debugging:
+            print(f"Synchronizing {entity} changed after {checkpoint}" if checkpoint else f"Full {entity} sync")
+
+        high_water_mark, high_water_date = checkpoint, checkpoint_date
+        changed = []
+        async for page in self.__iter_pages(lambda page_number: fetch_page(page_number, filters),
+                                            items_per_page=items_per_page,
+                                            prefetch=max_concurrency - 1,
+                                            description=entity):
+            records = []
+            for record in page['data']:
+                change_date = parse_change_date(record.get('last_change_date'))
+                # records are filtered locally too, so sync is correct even if filter is ignored by API
+                if checkpoint_date and change_date and change_date < checkpoint_date:
+                    continue
+                if change_date and (high_water_date is None or change_date > high_water_date):
+                    high_water_mark, high_water_date = record['last_change_date'], change_date
+                records.append(record)
+            changed.extend(store.upsert(entity, records))
+
+        # checkpoint is moved only after all the pages were saved
+        if high_water_mark:
+            store.set_checkpoint(entity, high_water_mark)
+        if self.__show_debugging:
+            print(f"{len(changed)} {entity} were added or changed")
+        return changed
+
+    async def sync_clients(self, store: SQLiteCheckpointStore, clients_per_page: int = 200, full: bool = False,
+                           max_concurrency: int = 1) -> list:
+        """
+        Incremental clients synchronization. The first run loads all the clients,
+         next runs load only clients with last_change_date after the saved checkpoint
+        :param store: checkpoint store, for example SQLiteCheckpointStore('yclients.sqlite3')
+        :param clients_per_page: size of the page
+        :param full: drop stored clients and load all of them again
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :return: clients which were added or changed since the previous synchronization,
+            all the synchronized clients are available via store.records('clients')
+        """
+        return await self.__sync('clients',
+                                 lambda page, filters: self.__get_clients_page(page, None, clients_per_page, filters),
+                                 items_per_page=clients_per_page, store=store, full=full,
+                                 max_concurrency=max_concurrency)
+
+    async def sync_visits(self, store: SQLiteCheckpointStore, visits_per_page: int = 200, full: bool = False,
+                          max_concurrency: int = 1) -> list:
+        """
+        Incremental synchronization of visits of all the clients. The first run loads all the visits,
+         next runs load only visits with last_change_date after the saved checkpoint
+        :param store: checkpoint store, for example SQLiteCheckpointStore('yclients.sqlite3')
+        :param visits_per_page: size of the page
+        :param full: drop stored visits and load all of them again
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :return: visits which were added or changed since the previous synchronization,
+            all the synchronized visits are available via store.records('visits')
+        """
+        return await self.__sync('visits',
+                                 lambda page, filters: self.__get_visits_page(cid=None,
+                                                                              page_number=page,
+                                                                              session=None,
+                                                                              visits_per_page=visits_per_page,
+                                                                              filters=filters),
+                                 items_per_page=visits_per_page, store=store, full=full,
+                                 max_concurrency=max_concurrency)
+
     """VISITS DATA"""
 
-    async def __get_visits_page(self, cid: int, page_number: int, session: httpx.AsyncClient, visits_per_page: int) -> dict:
+    async def __get_visits_page(self, cid: int | None, page_number: int, session: httpx.AsyncClient | None,
+                                visits_per_page: int, filters: dict = None) -> dict:
         """
         Yclients api can't return all visits at once and returns in groups
          of maximum size of 200. Those groups are called pages and you can
          choose how many visits it will return
+        :param cid: client id, visits of all the clients are returned if None
         :param page_number: number of page
-        :param session: requests.Session() object
+        :param session: httpx.AsyncClient object, the shared client is used if None
         :param visits_per_page: size of the page
+        :param filters: additional request parameters
         :return: data of visits on the page page_number
         """
-        st = time.time()
         url = f"https://api.yclients.com/api/v1/records/{self.company_id}"
         querystring = {
-            "client_id": cid,
             "count": visits_per_page,
             "page": page_number
         }
-        response = await session.get(url, headers=self.headers, params=querystring)
-        if self.__show_debugging:
-            print(f'Visits page {page_number} obtained in {time.time() - st} sec')
+        if cid is not None:
+            querystring["client_id"] = cid
+        querystring.update(filters or {})
+        response = await self.__request("GET", url, session=session, params=querystring)
+        return self.__loads(response.content)
 
-        return ujson.loads(response.text)
+    def __visits_filters(self, start_date=None, end_date=None, staff_id: int = None) -> dict:
+        """
+        Filters of visits which are applied by API
+        :param start_date: date or datetime or string, visits from this date
+        :param end_date: date or datetime or string, visits till this date inclusive
+        :param staff_id: staff id
+        :return: request parameters
+        """
+        filters = {}
+        if start_date:
+            filters["start_date"] = to_day(start_date)
+        if end_date:
+            filters["end_date"] = to_day(end_date)
+        if staff_id:
+            filters["staff_id"] = int(staff_id)
+        return filters
+
+    async def __collect_visits(self, cid: int, visits_per_page: int, session: httpx.AsyncClient | None,
+                               semaphore: asyncio.Semaphore, raw: bool = True, filters: dict = None) -> list:
+        """
+        Load all visits pages of client cid, every request waits for the semaphore,
+         so one semaphore can limit requests for many clients at once
+        :param cid: client id, visits of all the clients are loaded if None
+        :param visits_per_page: size of the page
+        :param session: httpx.AsyncClient object, the shared client is used if None
+        :param semaphore: limits number of simultaneous requests
+        :param raw: return dictionaries if True, otherwise Visit objects
+        :param filters: additional request parameters
+        :return: data of all the visits of client cid
+        """
+        pages = await self.__fetch_pages(lambda page: self.__get_visits_page(cid=cid,
+                                                                             page_number=page,
+                                                                             session=session,
+                                                                             visits_per_page=visits_per_page,
+                                                                             filters=filters),
+                                         items_per_page=visits_per_page,
+                                         semaphore=semaphore,
+                                         description="visits" if cid is None else f"visits for clients {cid}")
+        visits_data_list = []
+        for page in pages:
+            visits_data_list.extend(page['data'] if raw else Visit.from_list(page['data']))
+        return visits_data_list
 
-    async def get_visits_for_client(self, cid: int, visits_per_page: int = 200, session: httpx.AsyncClient = None) -> list:
+    async def get_visits_for_client(self, cid: int, visits_per_page: int = 200, session: httpx.AsyncClient = None,
+                                    max_concurrency: int = 1, raw: bool = True, start_date=None, end_date=None,
+                                    staff_id: int = None) -> list:
         """
         :param cid: client id
         :param visits_per_page: size of the page
-        :param session: None by default, but if we get visits for multiple clients,
-            we want to use the same session for all of them
+        :param session: None by default to use the shared client of the API object,
+            pass httpx.AsyncClient to send requests through it instead
+        :param max_concurrency: how many pages can be loaded simultaneously
+            after total number of visits is known
+        :param raw: return dictionaries if True, otherwise Visit objects
+            with lazily parsed datetime, staff, client and services
+        :param start_date: load visits from this date only
+        :param end_date: load visits till this date inclusive only
+        :param staff_id: load visits to this staff only
         :return: data of all the visits of client cid
             visit parameters:
                  id, company_id, staff_id, services, goods_transactions,
@@ -291,52 +856,112 @@ class AsyncYClientsAPI:
             Parameters description is  accesible via:
             https://github.com/petroff/api-blueprint/blob/master/apiary.apib
         """
-        if not session:
-            session = httpx.AsyncClient(trust_env=False)
-
-        with session:
-
-            # In the first request we obtain total number of client visits in system
-            first_request = await self.__get_visits_page(cid=cid,
-                                                   page_number=1,
-                                                   session=session,
-                                                   visits_per_page=visits_per_page)
-            visits_data_list = first_request['data']
-            # total number of visits
-            visits_number = first_request['meta']['total_count']
-            # number of pages that we need to request
-            pages_number = int(visits_number / visits_per_page) + 1
-            if self.__show_debugging:
-                print(f"There are {visits_number} visits for clients {cid} in the system")
-                if pages_number > 1:
-                    print(f"{pages_number} pages will be loaded")
-
-            if pages_number == 1:
-                return visits_data_list
+        return await self.__collect_visits(cid, visits_per_page, session, asyncio.Semaphore(max_concurrency), raw,
+                                           self.__visits_filters(start_date, end_date, staff_id))
 
-            for page in range(2, pages_number + 1):
-                new_page_request = await self.__get_visits_page(cid=cid,
-                                                          page_number=page,
-                                                          session=session,
-                                                          visits_per_page=visits_per_page)
-                visits_data_list.extend(new_page_request['data'])
-            return visits_data_list
+    async def iter_visits(self, cid: int, visits_per_page: int = 200, prefetch: int = 0, batch: bool = False,
+                          raw: bool = True):
+        """
+        Iterate over visits of client cid while pages are loaded,
+         so only current and prefetched pages are kept in memory
+            async for visit in api.iter_visits(cid, prefetch=2):
+                ...
+        :param cid: client id
+        :param visits_per_page: size of the page
+        :param prefetch: how many next pages are loaded in background while current page is processed
+        :param batch: yield list of visits of every page instead of separate visits
+        :param raw: yield dictionaries if True, otherwise Visit objects
+        :return: async generator of visits data, see get_visits_for_client for parameters
+        """
+        async for page in self.__iter_pages(lambda page_number: self.__get_visits_page(cid=cid,
+                                                                                       page_number=page_number,
+                                                                                       session=None,
+                                                                                       visits_per_page=visits_per_page),
+                                            items_per_page=visits_per_page,
+                                            prefetch=prefetch,
+                                            description=f"visits for clients {cid}"):
+            visits = page['data'] if raw else Visit.from_list(page['data'])
+            if batch:
+                yield visits
+            else:
+                for visit in visits:
+                    yield visit
 
-    async def get_visits_data_for_clients_list(self, cids_list: list, visits_per_page=200) -> dict:
+    async def get_visits_data_for_clients_list(self, cids_list: list, visits_per_page=200,
+                                               max_concurrency: int = 1, raw: bool = True) -> dict:
         """
-        get_visits_for_client funtion wrapper for multiple clients
+        get_visits_for_client funtion wrapper for multiple clients.
+        Pages of all the clients are loaded concurrently, max_concurrency
+         limits number of simultaneous requests for the whole list
         :param cids_list: list of clients ids
         :param visits_per_page: size of the page
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :param raw: return dictionaries if True, otherwise Visit objects
         :return: dictionary with client id as key and list of visits as value
         """
-        session = httpx.AsyncClient(trust_env=False)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        clients_visits = await asyncio.gather(*(self.__collect_visits(cid, visits_per_page, None, semaphore, raw)
+                                                for cid in cids_list))
+        clients_visits_dictionary = dict(zip(cids_list, clients_visits))
+        return clients_visits_dictionary
 
-        clients_visits_dictionary = {cid: await self.get_visits_for_client(cid, visits_per_page, session)
-                                     for cid in cids_list}
+    async def get_visits_data_for_company(self, start_date, end_date, cids_list: list = None,
+                                          visits_per_page: int = 200, shard_days: int = 31,
+                                          max_concurrency: int = 1, raw: bool = True) -> dict:
+        """
+        Load visits of all the clients of the company for the date window and group them by client id.
+        The window is split to shards of shard_days days which are loaded concurrently,
+         so it needs number of pages of company records requests instead of at least
+         one request for every client
+        :param start_date: date or datetime or string, visits from this date
+        :param end_date: date or datetime or string, visits till this date inclusive
+        :param cids_list: list of clients ids, only their visits are returned if passed,
+            clients without visits get empty lists
+        :param visits_per_page: size of the page
+        :param shard_days: number of days in one shard, at least 1
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :param raw: return dictionaries if True, otherwise Visit objects
+        :return: dictionary with client id as key and list of visits as value,
+            the same as get_visits_data_for_clients_list returns
+        """
+        if shard_days < 1:
+            raise ValueError("shard_days must be at least 1")
+        first_day = datetime.date.fromisoformat(to_day(start_date))
+        last_day = datetime.date.fromisoformat(to_day(end_date))
+        shards = []
+        shard_start = first_day
+        while shard_start <= last_day:
+            shard_end = min(shard_start + datetime.timedelta(days=shard_days - 1), last_day)
+            shards.append(self.__visits_filters(shard_start, shard_end))
+            shard_start = shard_end + datetime.timedelta(days=1)
+        if self.__show_debugging:
+            print(f"Visits from {first_day} to {last_day} will be loaded in {len(shards)} shards")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        shards_visits = await asyncio.gather(*(self.__collect_visits(None, visits_per_page, None, semaphore, raw, filters)
+                                               for filters in shards))
+
+        clients_visits_dictionary = {cid: [] for cid in cids_list} if cids_list is not None else {}
+        seen_ids = set()
+        for visits in shards_visits:
+            for visit in visits:
+                visit_id = visit['id'] if raw else visit.id
+                # record can be returned twice if it was moved while shards were loaded
+                if visit_id in seen_ids:
+                    continue
+                seen_ids.add(visit_id)
+                cid = (visit.get('client') or {}).get('id') if raw else visit.client_id
+                if cid is None:
+                    continue
+                if cids_list is None:
+                    clients_visits_dictionary.setdefault(cid, []).append(visit)
+                elif cid in clients_visits_dictionary:
+                    clients_visits_dictionary[cid].append(visit)
         return clients_visits_dictionary
 
     async def get_attended_visits_for_client(self, cid: int, visits_per_page: int = 200,
-                                       session: httpx.AsyncClient = None) -> list:
+                                             session: httpx.AsyncClient = None, max_concurrency: int = 1,
+                                             start_date=None, end_date=None, staff_id: int = None) -> list:
         """
         Attendance explanation from Yclient API:
             2 - The user has confirmed the entry,
@@ -345,49 +970,128 @@ class AsyncYClientsAPI:
             -1 - the user did not come for a visit
         :param cid: client id
         :param visits_per_page: size of the page
-        :param session: None by default, but if we get visits for multiple clients,
-            we want to use the same session for all of them
+        :param session: None by default to use the shared client of the API object,
+            pass httpx.AsyncClient to send requests through it instead
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :param start_date: load visits from this date only
+        :param end_date: load visits till this date inclusive only
+        :param staff_id: load visits to this staff only
         :return: data of all the visits of client cid where attendance field is equal to 1
         """
         all_visits = await self.get_visits_for_client(cid=cid,
-                                                visits_per_page=visits_per_page,
-                                                session=session)
+                                                      visits_per_page=visits_per_page,
+                                                      session=session,
+                                                      max_concurrency=max_concurrency,
+                                                      start_date=start_date,
+                                                      end_date=end_date,
+                                                      staff_id=staff_id)
         attended_visits = [visit for visit in all_visits if visit['attendance'] == 1]
 
         return attended_visits
 
+    async def __summarize_attended_visits(self, cid: int, visits_per_page: int, session: httpx.AsyncClient | None,
+                                          semaphore: asyncio.Semaphore, filters: dict = None) -> dict:
+        """
+        Count attended visits of client cid while pages are loaded,
+         visits data is dropped right after the page is counted
+        :param cid: client id
+        :param visits_per_page: size of the page
+        :param session: httpx.AsyncClient object, the shared client is used if None
+        :param semaphore: limits number of simultaneous requests
+        :param filters: additional request parameters
+        :return: dictionary with id, visits_number, first_visit and last_visit,
+            dates are in YYYY-MM-DD format
+        """
+        summary = {'id': cid, 'visits_number': 0, 'first_visit': None, 'last_visit': None}
+
+        async def count_page(page_number: int) -> dict:
+            page = await self.__get_visits_page(cid=cid,
+                                                page_number=page_number,
+                                                session=session,
+                                                visits_per_page=visits_per_page,
+                                                filters=filters)
+            for visit in page['data']:
+                if visit['attendance'] != 1:
+                    continue
+                # local date is the YYYY-MM-DD prefix of iso8601 datetime, so dates are compared as strings
+                visit_date = visit['datetime'][:10]
+                summary['visits_number'] += 1
+                if summary['first_visit'] is None or visit_date < summary['first_visit']:
+                    summary['first_visit'] = visit_date
+                if summary['last_visit'] is None or visit_date > summary['last_visit']:
+                    summary['last_visit'] = visit_date
+            # only meta is needed to find out number of pages
+            return {'meta': page['meta']}
+
+        await self.__fetch_pages(count_page,
+                                 items_per_page=visits_per_page,
+                                 semaphore=semaphore,
+                                 description=f"visits for clients {cid}")
+        return summary
+
+    async def get_attended_visits_summary(self, cid: int, visits_per_page: int = 200, max_concurrency: int = 1,
+                                          start_date=None, end_date=None, staff_id: int = None) -> dict:
+        """
+        Number of attended visits and dates of the first and the last of them,
+         computed while pages are loaded without keeping visits in memory
+        :param cid: client id
+        :param visits_per_page: size of the page
+        :param max_concurrency: how many pages can be loaded simultaneously
+        :param start_date: count visits from this date only
+        :param end_date: count visits till this date inclusive only
+        :param staff_id: count visits to this staff only
+        :return: dictionary with keys:
+            - id: client id
+            - visits_number: number of attended visits
+            - first_visit: date of client first attended visit or None
+            - last_visit: date of client last attended visit or None
+        """
+        summary = await self.__summarize_attended_visits(cid, visits_per_page, None,
+                                                         asyncio.Semaphore(max_concurrency),
+                                                         self.__visits_filters(start_date, end_date, staff_id))
+        for key in ('first_visit', 'last_visit'):
+            if summary[key] is not None:
+                summary[key] = datetime.date.fromisoformat(summary[key])
+        return summary
+
     async def get_attended_visits_dates_information(self, cids_lists: list, visits_per_page: int = 200,
-                                              session: httpx.AsyncClient = None) -> pd.DataFrame:
+                                                    session: httpx.AsyncClient = None,
+                                                    max_concurrency: int = 1, start_date=None, end_date=None,
+                                                    staff_id: int = None) -> 'pd.DataFrame':
         """
+        Attended visits are counted while pages are loaded, so visits themselves are not kept in memory.
+        Requires pandas
         :param cids_lists: clients ids list
         :param visits_per_page: size of the page
-        :param session: None by default, but if we get visits for multiple clients,
-            we want to use the same session for all of them
+        :param session: None by default to use the shared client of the API object,
+            pass httpx.AsyncClient to send requests through it instead
+        :param max_concurrency: how many pages can be loaded simultaneously for the whole list
+        :param start_date: count visits from this date only
+        :param end_date: count visits till this date inclusive only
+        :param staff_id: count visits to this staff only
         :return: Dataframe with columns:
             - id: client id
             - visits_number: number of attended visits
             - first_visit: date of client first attended visit
             - last_visit: date of client last attended visit
         """
-        columns = ['id', 'visits_number', 'first_visit', 'last_visit']
-        df = pd.DataFrame(columns=columns)
-        for cid in cids_lists:
-            c_dict = {'id': cid}
-            attended_visits = await self.get_attended_visits_for_client(cid=cid,
-                                                                        visits_per_page=visits_per_page,
-                                                                        session=session
-                                                                        )
-            visit_dates = [visit['datetime'] for visit in attended_visits]
-
-            if not visit_dates:
-                c_dict['visits_number'] = 0
-                c_dict['first_visit'] = None
-                c_dict['last_visit'] = None
-            else:
-                visit_dates = list(map(self.datetime_parser, visit_dates))
-                c_dict['visits_number'] = len(visit_dates)
-                c_dict['first_visit'] = min(visit_dates).date()
-                c_dict['last_visit'] = max(visit_dates).date()
+        # imported before loading, so missing pandas is reported without sending requests
+        from . import frames
+        semaphore = asyncio.Semaphore(max_concurrency)
+        filters = self.__visits_filters(start_date, end_date, staff_id)
+        summaries = await asyncio.gather(*(self.__summarize_attended_visits(cid, visits_per_page, session,
+                                                                            semaphore, filters)
+                                           for cid in cids_lists))
+        return frames.visits_dates_frame(summaries)
 
-            df = df.append(c_dict, ignore_index=True)
-        return df
+    def parse_attended_visits_dates(self, clients_visits: dict) -> 'pd.DataFrame':
+        """
+        Columnar version of attended visits information for already loaded visits,
+         for example from get_visits_data_for_company or get_visits_data_for_clients_list.
+        Requires pandas
+        :param clients_visits: dictionary with client id as key and list of visits as value,
+            visits can be dictionaries or Visit models (raw=False)
+        :return: Dataframe with the same columns as get_attended_visits_dates_information returns
+        """
+        from . import frames
+        return frames.attended_visits_dates_frame(clients_visits)
@@ -0,0 +1,54 @@
+# coding=utf-8
+"""
+Import time guard: asyyclients must be importable without loading pandas,
+ exits with status 1 if pandas is imported or import takes longer than --max-ms
+
+    python -m benchmarks.import_time --max-ms 500
+"""
+import argparse
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow')
+
+CHECK = f"""
+import sys, time
+st = time.perf_counter()
+import asyyclients
+elapsed = time.perf_counter() - st
+print(elapsed * 1000)
+print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+
+def measure(runs: int) -> tuple:
+    """ :return: best import time in milliseconds and heavy modules imported with asyyclients """
+    times, heavy_modules = [], set()
+    for _ in range(runs):
+        # every run is a fresh interpreter, so nothing is imported yet
+        output = subprocess.run([sys.executable, '-c', CHECK], check=True, capture_output=True,
+                                text=True).stdout.splitlines()
+        times.append(float(output[0]))
+        heavy_modules.update(filter(None, output[1].split(',')))
+    return min(times), sorted(heavy_modules)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='number of measurements, the best one is reported')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if import takes longer')
+    args = parser.parse_args(argv)
+
+    import_time, heavy_modules = measure(args.runs)
+    print(f"import asyyclients: {import_time:.1f} ms")
+    if heavy_modules:
+        print(f"FAIL: {', '.join(heavy_modules)} imported with asyyclients")
+        return 1
+    if args.max_ms is not None and import_time > args.max_ms:
+        print(f"FAIL: import takes longer than {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
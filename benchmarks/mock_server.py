@@ -0,0 +1,141 @@
+# coding=utf-8
+import asyncio
+import datetime
+import random
+import time
+
+import httpx
+import ujson
+
+
+class MockYClients:
+    """
+    Local stand-in of YCLIENTS API for httpx.MockTransport. Emulates /clients, /records,
+     /book_staff, /book_services, /book_dates, /book_times and /book_record with
+     generated dataset, latency, rate limit and error injection
+    """
+
+    def __init__(self, clients_number: int = 1000, visits_per_client: int = 5, staff_number: int = 5,
+                 max_page_size: int = 200, latency: float = 0.0, rate_limit: float = None,
+                 error_rate: float = 0.0, seed: int = 0):
+        """
+        :param clients_number: number of generated clients
+        :param visits_per_client: average number of visits of a client
+        :param staff_number: number of staff
+        :param max_page_size: maximum page size, bigger count parameter is cut
+        :param latency: delay of every response in seconds
+        :param rate_limit: requests per second, 429 with Retry-After is returned if exceeded
+        :param error_rate: share of responses with 502 status
+        :param seed: random seed of dataset and errors
+        """
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.requests_number = 0
+        self.__random = random.Random(seed)
+        self.__window_start = time.monotonic()
+        self.__window_requests = 0
+        self.staff = [{"id": i, "name": f"Staff {i}", "bookable": True, "specialization": "Master",
+                       "position": {"id": 1, "title": "Master"}, "rating": 5, "votes_count": 1}
+                      for i in range(1, staff_number + 1)]
+        self.clients = [self.__client(i) for i in range(1, clients_number + 1)]
+        self.visits = []
+        for client in self.clients:
+            for _ in range(self.__random.randint(0, 2 * visits_per_client)):
+                self.visits.append(self.__visit(len(self.visits) + 1, client))
+        self.visits.sort(key=lambda visit: visit['datetime'])
+        self.client_visits = {}
+        for visit in self.visits:
+            self.client_visits.setdefault(visit['client']['id'], []).append(visit)
+
+    def __client(self, i: int) -> dict:
+        change_date = datetime.datetime(2022, 1, 1) + datetime.timedelta(minutes=self.__random.randint(0, 500000))
+        return {"id": i, "name": f"Client {i}", "phone": f"7900{i:07d}", "email": f"client{i}@example.com",
+                "card": "", "birth_date": "", "comment": "", "discount": 0, "visits": 0, "sex_id": 0, "sex": "",
+                "sms_check": 0, "sms_bot": 0, "spent": self.__random.randint(0, 50000), "paid": 0, "balance": 0,
+                "importance_id": 0, "importance": "", "categories": [{"id": 1, "title": "Regular"}],
+                "last_change_date": change_date.strftime("%Y-%m-%dT%H:%M:%S+0300"), "custom_fields": []}
+
+    def __visit(self, i: int, client: dict) -> dict:
+        date_time = datetime.datetime(2022, 1, 1, 9) + datetime.timedelta(days=self.__random.randint(0, 364),
+                                                                           hours=self.__random.randint(0, 10))
+        staff = self.__random.choice(self.staff)
+        return {"id": i, "company_id": 1, "staff_id": staff["id"],
+                "services": [{"id": 1, "title": "Haircut", "cost": 1000, "amount": 1}],
+                "staff": staff, "client": {"id": client["id"], "name": client["name"], "phone": client["phone"]},
+                "date": date_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "datetime": date_time.strftime("%Y-%m-%dT%H:%M:%S+03:00"),
+                "create_date": date_time.strftime("%Y-%m-%dT%H:%M:%S+03:00"),
+                "attendance": self.__random.choice([-1, 0, 1, 1, 2]), "seance_length": 3600, "length": 3600,
+                "deleted": False, "last_change_date": date_time.strftime("%Y-%m-%dT%H:%M:%S+0300")}
+
+    @staticmethod
+    def __json(status_code: int, data) -> httpx.Response:
+        return httpx.Response(status_code, content=ujson.dumps(data, ensure_ascii=False).encode(),
+                              headers={"Content-Type": "application/json"})
+
+    def __page(self, items: list, params) -> httpx.Response:
+        count = min(int(params.get("count", 20)), self.max_page_size)
+        page = int(params.get("page", 1))
+        return self.__json(200, {"success": True, "data": items[(page - 1) * count:page * count],
+                                 "meta": {"total_count": len(items)}})
+
+    def __rate_limited(self) -> bool:
+        now = time.monotonic()
+        if now - self.__window_start >= 1:
+            self.__window_start, self.__window_requests = now, 0
+        self.__window_requests += 1
+        return self.__window_requests > self.rate_limit
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests_number += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit and self.__rate_limited():
+            return httpx.Response(429, headers={"Retry-After": "1"})
+        if self.error_rate and self.__random.random() < self.error_rate:
+            return httpx.Response(502)
+
+        params = request.url.params
+        segments = request.url.path.strip('/').split('/')
+        endpoint = segments[2] if len(segments) > 2 else ''
+        if endpoint == 'clients':
+            clients = self.clients
+            if params.get("changed_after"):
+                changed_after = params["changed_after"]
+                clients = [client for client in clients if client["last_change_date"] >= changed_after]
+            return self.__page(clients, params)
+        if endpoint == 'records':
+            visits = self.client_visits.get(int(params["client_id"]), []) if "client_id" in params else self.visits
+            if params.get("start_date"):
+                visits = [visit for visit in visits
+                          if params["start_date"] <= visit["datetime"][:10] <= params.get("end_date", "9999")]
+            if params.get("staff_id"):
+                visits = [visit for visit in visits if visit["staff_id"] == int(params["staff_id"])]
+            if params.get("changed_after"):
+                changed_after = params["changed_after"]
+                visits = [visit for visit in visits if visit["last_change_date"] >= changed_after]
+            return self.__page(visits, params)
+        if endpoint == 'book_staff':
+            return self.__json(200, {"success": True, "data": self.staff})
+        if endpoint == 'book_services':
+            return self.__json(200, {"success": True, "data": {"services": [
+                {"id": 1, "title": "Haircut", "price_min": 1000, "price_max": 1000, "seance_length": 3600}]}})
+        if endpoint == 'book_dates':
+            days = [(datetime.date(2022, 9, 1) + datetime.timedelta(days=i)).isoformat() for i in range(30)]
+            return self.__json(200, {"success": True, "data": {"booking_dates": days, "working_dates": days}})
+        if endpoint == 'book_times':
+            day = segments[-1]
+            return self.__json(200, {"success": True, "data": [
+                {"time": f"{hour}:00", "seance_length": 3600, "sum_length": 3600,
+                 "datetime": f"{day}T{hour}:00:00+03:00"} for hour in range(10, 20)]})
+        if endpoint == 'book_record':
+            body = ujson.loads(request.content)
+            return self.__json(201, [{"id": appointment["id"], "record_id": self.__random.randint(1, 10 ** 9),
+                                      "record_hash": "hash"} for appointment in body["appointments"]])
+        return self.__json(404, {"success": False, "data": None, "meta": {"message": "Not found"}})
+
+    def client(self, **kwargs) -> httpx.AsyncClient:
+        """ :return: httpx.AsyncClient which sends requests to this mock """
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler), **kwargs)
@@ -0,0 +1,220 @@
+# coding=utf-8
+"""
+Offline benchmarks of asyyclients against local mock of YCLIENTS API
+
+    python -m benchmarks.run --clients 5000 --latency 0.02 --concurrency 10
+    python -m benchmarks.run --quick --json bench.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+
+import ujson
+
+from asyyclients import AsyncYClientsAPI, Retry, SQLiteCheckpointStore
+
+from .mock_server import MockYClients
+
+
+async def bench_get_clients_data(api: AsyncYClientsAPI, mock: MockYClients, args):
+    return await api.get_clients_data(max_concurrency=args.concurrency)
+
+
+async def bench_iter_clients(api: AsyncYClientsAPI, mock: MockYClients, args):
+    count = 0
+    async for _ in api.iter_clients(prefetch=args.concurrency - 1):
+        count += 1
+    return count
+
+
+async def bench_visits_for_clients_list(api: AsyncYClientsAPI, mock: MockYClients, args):
+    cids = [client['id'] for client in mock.clients[:args.visit_clients]]
+    return await api.get_visits_data_for_clients_list(cids, max_concurrency=args.concurrency)
+
+
+async def bench_visits_for_company(api: AsyncYClientsAPI, mock: MockYClients, args):
+    cids = [client['id'] for client in mock.clients[:args.visit_clients]]
+    return await api.get_visits_data_for_company('2022-01-01', '2022-12-31', cids_list=cids,
+                                                 max_concurrency=args.concurrency)
+
+
+async def bench_parse_clients_data(api: AsyncYClientsAPI, mock: MockYClients, args):
+    return api.parse_clients_data(mock.clients)
+
+
+async def bench_booking_flow(api: AsyncYClientsAPI, mock: MockYClients, args):
+    async def flow(i: int):
+        staff = await api.get_staff()
+        staff_id = staff['data'][i % len(staff['data'])]['id']
+        services = await api.get_services(staff_id=staff_id)
+        service_id = services['data']['services'][0]['id']
+        days = await api.get_available_days(staff_id=staff_id, service_id=service_id)
+        day = days['data']['booking_dates'][i % len(days['data']['booking_dates'])]
+        times = await api.get_available_times(staff_id=staff_id, service_id=service_id, day=day)
+        return await api.book(booking_id=0, fullname=f'Client {i}', phone='79000000000', email='',
+                              staff_id=staff_id, service_id=service_id, date_time=times['data'][0]['datetime'])
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited_flow(i: int):
+        async with semaphore:
+            return await flow(i)
+
+    return await asyncio.gather(*(limited_flow(i) for i in range(args.bookings)))
+
+
+async def bench_book_many(api: AsyncYClientsAPI, mock: MockYClients, args):
+    bookings = [dict(fullname=f'Client {i}', phone='79000000000', email='', staff_id=1, service_id=1,
+                     date_time=f'2022-09-01T{10 + i % 10}:00:00+03:00') for i in range(args.bookings)]
+    return await api.book_many(bookings, max_concurrency=args.concurrency)
+
+
+async def bench_availability_matrix(api: AsyncYClientsAPI, mock: MockYClients, args):
+    matrix = await api.get_availability_matrix([staff['id'] for staff in mock.staff], [1],
+                                               max_concurrency=args.concurrency)
+    return matrix.next_free_slot('2022-09-01')
+
+
+def check(condition: bool, message: str):
+    """ Benchmarks which check results raise AssertionError even with python -O """
+    if not condition:
+        raise AssertionError(message)
+
+
+async def bench_sync(api: AsyncYClientsAPI, mock: MockYClients, args):
+    """
+    Synchronize clients and visits, change some records in the mock and synchronize again:
+     the second run must return only changed records and full=True must rebuild the store
+    """
+    # newer than any generated record
+    change_date = '2023-06-01T12:00:00+0300'
+    with SQLiteCheckpointStore(':memory:') as store:
+        for entity, sync, records in (('clients', api.sync_clients, mock.clients),
+                                      ('visits', api.sync_visits, mock.visits)):
+            requests_before = mock.requests_number
+            first = await sync(store, max_concurrency=args.concurrency)
+            first_requests = mock.requests_number - requests_before
+            check(len(first) == len(records), f"first {entity} sync returned {len(first)} of {len(records)}")
+            check(store.get_checkpoint(entity) is not None, f"{entity} checkpoint is not saved")
+
+            changed = records[::max(len(records) // 10, 1)]
+            original_dates = [record['last_change_date'] for record in changed]
+            try:
+                for record in changed:
+                    record['last_change_date'] = change_date
+                requests_before = mock.requests_number
+                second = await sync(store, max_concurrency=args.concurrency)
+                # only pages of changed records are loaded after the checkpoint
+                check(mock.requests_number - requests_before < first_requests,
+                      f"second {entity} sync loaded all the pages")
+                check(sorted(record['id'] for record in second) == sorted(record['id'] for record in changed),
+                      f"second {entity} sync returned {len(second)} records instead of {len(changed)} changed")
+                check(store.get_checkpoint(entity) == change_date, f"{entity} checkpoint is not moved")
+                third = await sync(store, max_concurrency=args.concurrency)
+                check(not third, f"{entity} sync without changes returned {len(third)} records")
+
+                # record which isn't in the mock must disappear after full sync
+                store.upsert(entity, [{'id': -1, 'last_change_date': None}])
+                full = await sync(store, full=True, max_concurrency=args.concurrency)
+                check(len(full) == len(records), f"full {entity} sync returned {len(full)} of {len(records)}")
+                check(store.ids(entity) == sorted(record['id'] for record in records),
+                      f"full {entity} sync didn't reset the store")
+            finally:
+                for record, original_date in zip(changed, original_dates):
+                    record['last_change_date'] = original_date
+
+
+BENCHMARKS = {
+    'get_clients_data': (bench_get_clients_data, {}),
+    'iter_clients': (bench_iter_clients, {}),
+    'get_visits_data_for_clients_list': (bench_visits_for_clients_list, {}),
+    'get_visits_data_for_company': (bench_visits_for_company, {}),
+    'parse_clients_data': (bench_parse_clients_data, {}),
+    'booking_flow': (bench_booking_flow, {}),
+    'booking_flow_cached': (bench_booking_flow, {'cache': True}),
+    'book_many': (bench_book_many, {}),
+    'availability_matrix': (bench_availability_matrix, {}),
+    'sync_clients_and_visits': (bench_sync, {}),
+}
+
+
+def warm_up_frames():
+    # pandas is imported on the first parse call, import time must not be measured as parsing time
+    import asyyclients.frames  # noqa: F401
+
+
+# called before measurement starts
+WARM_UPS = {
+    'parse_clients_data': warm_up_frames,
+}
+
+
+async def run_benchmark(name: str, args, mock: MockYClients) -> dict:
+    benchmark, api_options = BENCHMARKS[name]
+    if name in WARM_UPS:
+        WARM_UPS[name]()
+    requests_before = mock.requests_number
+    async with AsyncYClientsAPI(token='token', company_id=1, form_id=1, client=mock.client(),
+                                rate_limit=args.client_rate_limit, retry=Retry(backoff_factor=0.05),
+                                json_backend=args.json_backend, **api_options) as api:
+        tracemalloc.start()
+        st = time.perf_counter()
+        await benchmark(api, mock, args)
+        wall_time = time.perf_counter() - st
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    requests_number = mock.requests_number - requests_before
+    return {
+        'benchmark': name,
+        'requests': requests_number,
+        'wall_time': wall_time,
+        'requests_per_second': requests_number / wall_time if wall_time else 0.0,
+        'peak_memory_mb': peak_memory / 2 ** 20,
+    }
+
+
+def parse_args(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=5000, help='number of clients in the dataset')
+    parser.add_argument('--visits-per-client', type=int, default=5, help='average number of visits of a client')
+    parser.add_argument('--visit-clients', type=int, default=300, help='clients whose visits are loaded')
+    parser.add_argument('--page-size', type=int, default=200, help='maximum page size of the mock')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock response delay in seconds')
+    parser.add_argument('--rate-limit', type=float, default=None, help='mock rate limit, requests per second')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 502 responses')
+    parser.add_argument('--client-rate-limit', type=float, default=None, help='client side rate limit')
+    parser.add_argument('--concurrency', type=int, default=10, help='max_concurrency of the client')
+    parser.add_argument('--bookings', type=int, default=50, help='number of booking flows')
+    parser.add_argument('--json-backend', default='ujson', choices=['ujson', 'orjson', 'json'],
+                        help='json_backend of the client')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--quick', action='store_true', help='small dataset for CI')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.clients, args.visit_clients, args.bookings, args.latency = 1000, 50, 10, 0.005
+    return args
+
+
+async def main(argv: list = None) -> list:
+    args = parse_args(argv)
+    mock = MockYClients(clients_number=args.clients, visits_per_client=args.visits_per_client,
+                        max_page_size=args.page_size, latency=args.latency, rate_limit=args.rate_limit,
+                        error_rate=args.error_rate)
+    results = []
+    print(f"{'benchmark':<34}{'requests':>10}{'wall, s':>10}{'req/s':>10}{'peak, MB':>10}")
+    for name in args.only or BENCHMARKS:
+        result = await run_benchmark(name, args, mock)
+        results.append(result)
+        print(f"{result['benchmark']:<34}{result['requests']:>10}{result['wall_time']:>10.3f}"
+              f"{result['requests_per_second']:>10.1f}{result['peak_memory_mb']:>10.2f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            ujson.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1:]))
@@ -104,6 +104,9 @@ async def main():
     # Show attended visits information for clients with at least one visit:
     print(f"Attended visits ndataframe with no gaps {df[df['visits_number'] > 0]}")
 
+    # Close connections of the API object
+    await api.aclose()
+
 
 if __name__ == '__main__':
     asyncio.run(main())